@@ -1,10 +1,23 @@
 import httpx
 import asyncio
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, Any
+from functools import lru_cache, cached_property
 import logging
 from pydantic import BaseModel, Field
 from sdprompt.config import BFLModel
+from sdprompt.utils.files import write_stream
+from sdprompt.utils import fastjson
+
+# Valid BFL model ids, precomputed for O(1) validation
+_BFL_VALUES = frozenset(m.value for m in BFLModel)
+_BFL_VALUES_STR = ", ".join(m.value for m in BFLModel)
+
+# Upper bound for a single /get_result request
+_POLL_REQUEST_TIMEOUT = 10.0
+
+# Download attempts per finished generation before giving up on it
+_DOWNLOAD_ATTEMPTS = 3
 
 class BFLParameters(BaseModel):
     """Parameters for BFL image generation"""
@@ -12,11 +25,43 @@ class BFLParameters(BaseModel):
     height: int = Field(1024, ge=512, le=2048)
     model: BFLModel = BFLModel.FLUX_PRO_11
 
+    class Config:
+        frozen = True
+
+    @cached_property
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialized parameters, computed once per (immutable) instance"""
+        return self.model_dump()
+
+@lru_cache(maxsize=256)
+def build_bfl_parameters(
+    width: int = 1024,
+    height: int = 1024,
+    model: BFLModel = BFLModel.FLUX_PRO_11
+) -> BFLParameters:
+    """Build BFLParameters, reusing the validated instance for identical inputs"""
+    return BFLParameters(width=width, height=height, model=model)
+
 class BFLGenerator:
-    def __init__(self, api_key: str, model: str, base_url: str = "https://api.us1.bfl.ai/v1"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str = "https://api.us1.bfl.ai/v1",
+        poll_initial: float = 0.5,
+        poll_max: float = 5.0,
+        poll_factor: float = 1.5,
+        max_concurrency: int = 4,
+        overall_timeout: float = 300.0,
+    ):
         self.api_key = api_key
         self.model = self._normalize_model_id(model)
         self.base_url = base_url
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.poll_factor = poll_factor
+        self.overall_timeout = overall_timeout
+        self._sem = asyncio.Semaphore(max_concurrency)
         # Remove 'bfl_' prefix for the actual API call
         api_key_clean = api_key.replace('bfl_', '') if api_key.startswith('bfl_') else api_key
         self.client = httpx.AsyncClient(
@@ -26,17 +71,30 @@ class BFLGenerator:
                 "accept": "application/json",
                 "Content-Type": "application/json"
             },
-            timeout=60.0
+            timeout=60.0,
+            # Polls for concurrent generations multiplex over one connection
+            http2=True
         )
+        # Signed result URLs live on a different host, so downloads get their own client
+        self.download_client = httpx.AsyncClient(timeout=60.0)
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP clients"""
+        await self.client.aclose()
+        await self.download_client.aclose()
+
+    async def __aenter__(self) -> "BFLGenerator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
 
     def _normalize_model_id(self, model: str) -> str:
-        try:
-            return BFLModel(model).value
-        except ValueError:
-            raise ValueError(
-                f"Invalid model: {model}. Must be one of: "
-                f"{', '.join(m.value for m in BFLModel)}"
-            )
+        # BFLModel is a str enum, so members normalise to their value too
+        model = str(getattr(model, "value", model))
+        if model not in _BFL_VALUES:
+            raise ValueError(f"Invalid model: {model}. Must be one of: {_BFL_VALUES_STR}")
+        return model
 
     async def generate_image(
         self,
@@ -47,59 +105,99 @@ class BFLGenerator:
     ) -> dict:
         """Generate image using BFL API
         
-        Note: BFL does not support negative prompts, this parameter is ignored
+        Note: BFL does not support negative prompts, this parameter is ignored.
+        The parent directory of output_path must already exist.
         """
-        try:
-            # Submit generation request
-            response = await self.client.post(
-                f"/{self.model}",
-                json={
-                    "prompt": prompt,
-                    "width": parameters.width,
-                    "height": parameters.height
+        # Bound the number of in-flight generations
+        async with self._sem:
+            try:
+                deadline = asyncio.get_running_loop().time() + self.overall_timeout
+                request_id = await self._submit(prompt, parameters)
+                result_data = await self._poll(request_id, deadline)
+
+                # Retry only the download so a transient failure doesn't pay for a new generation
+                image_url = result_data["result"]["sample"]
+                for attempt in range(1, _DOWNLOAD_ATTEMPTS + 1):
+                    try:
+                        checksum = await self._download(image_url, output_path)
+                        break
+                    except Exception as e:
+                        if attempt == _DOWNLOAD_ATTEMPTS:
+                            raise
+                        logging.warning(
+                            f"Download of BFL result {request_id} failed "
+                            f"(attempt {attempt}/{_DOWNLOAD_ATTEMPTS}): {e}"
+                        )
+
+                return {
+                    "success": True,
+                    "engine": self.model,
+                    "checksum_sha256": checksum,
+                    "generation_settings": dict(parameters.as_dict)
                 }
-            )
-            
-            if response.status_code == 402:
-                raise RuntimeError("Insufficient BFL credits")
-            elif response.status_code == 429:
-                raise RuntimeError("Too many active BFL tasks")
-            response.raise_for_status()
-            
-            request_id = response.json()["id"]
-            
-            # Poll for results
-            while True:
-                await asyncio.sleep(0.5)  # Don't hammer the API
-                result = await self.client.get(
-                    "/get_result",
-                    params={"id": request_id}
+
+            except Exception as e:
+                raise RuntimeError(f"Failed to generate image: {str(e) or type(e).__name__}")
+
+    async def _submit(self, prompt: str, parameters: BFLParameters) -> str:
+        """Submit a generation request and return its request id"""
+        # Content-Type is already a client default
+        response = await self.client.post(
+            f"/{self.model}",
+            content=fastjson.dumps({
+                "prompt": prompt,
+                "width": parameters.width,
+                "height": parameters.height
+            })
+        )
+        
+        if response.status_code == 402:
+            raise RuntimeError("Insufficient BFL credits")
+        elif response.status_code == 429:
+            raise RuntimeError("Too many active BFL tasks")
+        response.raise_for_status()
+        
+        return fastjson.loads(response.content)["id"]
+
+    async def _poll(self, request_id: str, deadline: float) -> dict:
+        """Poll for results until the deadline, backing off while the status is unchanged"""
+        loop = asyncio.get_running_loop()
+        delay = self.poll_initial
+        last_status = None
+        while True:
+            await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"BFL generation {request_id} not ready after {self.overall_timeout:.0f}s"
                 )
-                result.raise_for_status()
-                result_data = result.json()
-                
-                if result_data["status"] == "Ready":
-                    # Download image from signed URL
-                    image_url = result_data["result"]["sample"]
-                    async with httpx.AsyncClient() as dl_client:
-                        img_response = await dl_client.get(image_url)
-                        img_response.raise_for_status()
-                        
-                        # Save image
-                        output_path.parent.mkdir(parents=True, exist_ok=True)
-                        with open(output_path, "wb") as f:
-                            f.write(img_response.content)
-                            
-                    return {
-                        "success": True,
-                        "engine": self.model,
-                        "generation_settings": parameters.dict()
-                    }
-                    
-                elif result_data["status"] == "Failed":
-                    raise RuntimeError(f"BFL generation failed: {result_data.get('error', 'Unknown error')}")
-                    
-                logging.info(f"BFL generation status: {result_data['status']}")
+            try:
+                result = await asyncio.wait_for(
+                    self.client.get("/get_result", params={"id": request_id}),
+                    timeout=min(_POLL_REQUEST_TIMEOUT, remaining)
+                )
+            except (TimeoutError, httpx.TransportError) as e:
+                # A slow or dropped poll doesn't end a paid generation; only the deadline does
+                logging.warning(f"Polling BFL generation {request_id} failed, retrying: {e!r}")
+                continue
+            result.raise_for_status()
+            result_data = fastjson.loads(result.content)
+            
+            if result_data["status"] == "Ready":
+                return result_data
+            elif result_data["status"] == "Failed":
+                raise RuntimeError(f"BFL generation failed: {result_data.get('error', 'Unknown error')}")
                 
-        except Exception as e:
-            raise RuntimeError(f"Failed to generate image: {str(e)}") 
\ No newline at end of file
+            logging.info(f"BFL generation status: {result_data['status']}")
+
+            if result_data["status"] != last_status:
+                last_status = result_data["status"]
+                delay = self.poll_initial
+            else:
+                delay = min(delay * self.poll_factor, self.poll_max)
+
+    async def _download(self, image_url: str, output_path: Path) -> str:
+        """Stream an image to disk and return its SHA256 checksum"""
+        async with self.download_client.stream("GET", image_url) as img_response:
+            img_response.raise_for_status()
+            return await write_stream(img_response, output_path)
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional, Dict, Any, Union, Literal
+from typing import Optional, Dict, Any, Union, Literal, Final, Tuple
 import os
 import yaml
 from pydantic import BaseModel, Field, field_validator
@@ -7,6 +7,14 @@ from dotenv import load_dotenv
 import re
 from enum import Enum
 
+# Prefer the libyaml-backed loader/dumper when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
+_STABILITY_KEY_RE = re.compile(r"^sk-[a-zA-Z0-9]{48}$")
+
 class StabilityModel(str, Enum):
     """Valid models for Stability AI API"""
     SD3_LARGE = "sd3-large"
@@ -45,10 +53,11 @@ class AnthropicConfig(BaseModel):
 class StabilityConfig(BaseModel):
     api_key: str = Field(..., pattern=r"^sk-")
     model: StabilityModel = Field(default=StabilityModel.SD35_LARGE)
+    max_concurrency: int = Field(default=4, ge=1)
 
     @field_validator("api_key")
     def validate_api_key(cls, v: str) -> str:
-        if not re.match(r"^sk-[a-zA-Z0-9]{48}$", v):
+        if not _STABILITY_KEY_RE.match(v):
             raise ValueError("Invalid Stability API key format")
         return v
 
@@ -56,6 +65,7 @@ class BFLConfig(BaseModel):
     api_key: str
     model: BFLModel = Field(default=BFLModel.FLUX_PRO_11)
     base_url: str = Field(default="https://api.us1.bfl.ai/v1")
+    max_concurrency: int = Field(default=4, ge=1)
 
     @field_validator("api_key")
     def validate_api_key(cls, v: str) -> str:
@@ -97,6 +107,41 @@ class AppConfig(BaseModel):
     output: OutputConfig = OutputConfig()
     logging: LoggingConfig = LoggingConfig()
 
+# Top-level config sections populated from env vars and CLI arguments
+_SECTIONS: Final[Tuple[str, ...]] = ("anthropic", "stability", "bfl", "output", "logging")
+
+# Map environment variables (without prefix) to config structure
+_ENV_MAPPING: Final[Tuple[Tuple[str, Tuple[str, str]], ...]] = (
+    ("ANTHROPIC_API_KEY", ("anthropic", "api_key")),
+    ("ANTHROPIC_MODEL", ("anthropic", "model")),
+    ("STABILITY_API_KEY", ("stability", "api_key")),
+    ("STABILITY_MODEL", ("stability", "model")),
+    ("STABILITY_MAX_CONCURRENCY", ("stability", "max_concurrency")),
+    ("BFL_API_KEY", ("bfl", "api_key")),
+    ("BFL_MODEL", ("bfl", "model")),
+    ("BFL_BASE_URL", ("bfl", "base_url")),
+    ("BFL_MAX_CONCURRENCY", ("bfl", "max_concurrency")),
+    ("OUTPUT_FORMAT", ("output", "format")),
+    ("OUTPUT_DIR", ("output", "directory")),
+    ("LOG_LEVEL", ("logging", "level")),
+    ("LOG_FILE", ("logging", "file")),
+)
+
+# Map CLI arguments to config structure
+_CLI_MAPPING: Final[Tuple[Tuple[str, Tuple[str, str]], ...]] = (
+    ("anthropic_api_key", ("anthropic", "api_key")),
+    ("anthropic_model", ("anthropic", "model")),
+    ("stability_api_key", ("stability", "api_key")),
+    ("stability_model", ("stability", "model")),
+    ("bfl_api_key", ("bfl", "api_key")),
+    ("bfl_model", ("bfl", "model")),
+    ("bfl_base_url", ("bfl", "base_url")),
+    ("output_format", ("output", "format")),
+    ("output_dir", ("output", "directory")),
+    ("log_level", ("logging", "level")),
+    ("log_file", ("logging", "file")),
+)
+
 class ConfigBuilder:
     """Builds and manages configuration from multiple sources"""
     
@@ -110,8 +155,9 @@ class ConfigBuilder:
         if not path.exists():
             raise FileNotFoundError(f"Config file not found: {path}")
             
-        with open(path) as f:
-            yaml_config = yaml.safe_load(f)
+        # Parse from one contiguous buffer rather than a text stream
+        yaml_config = yaml.load(path.read_bytes(), Loader=_Loader)
+        if yaml_config is not None:
             self.config.update(yaml_config)
 
     def load_env(self, path: Optional[Union[str, Path]] = None) -> None:
@@ -119,52 +165,23 @@ class ConfigBuilder:
         if path:
             load_dotenv(path)
 
-        # Map environment variables to config structure
-        env_mapping = {
-            "ANTHROPIC_API_KEY": ("anthropic", "api_key"),
-            "ANTHROPIC_MODEL": ("anthropic", "model"),
-            "STABILITY_API_KEY": ("stability", "api_key"),
-            "STABILITY_MODEL": ("stability", "model"),
-            "BFL_API_KEY": ("bfl", "api_key"),        # Add BFL mappings
-            "BFL_MODEL": ("bfl", "model"),
-            "BFL_BASE_URL": ("bfl", "base_url"),
-            "OUTPUT_FORMAT": ("output", "format"),
-            "OUTPUT_DIR": ("output", "directory"),
-            "LOG_LEVEL": ("logging", "level"),
-            "LOG_FILE": ("logging", "file"),
-        }
-
-        for env_var, config_path in env_mapping.items():
+        env = os.environ
+        sections = self._ensure_sections()
+        for env_var, (section, key) in _ENV_MAPPING:
             env_key = f"{self.env_prefix}{env_var}"
-            if env_key in os.environ:
-                self._set_nested_dict(self.config, config_path, os.environ[env_key])
+            if env_key in env:
+                sections[section][key] = env[env_key]
 
     def update_from_cli(self, cli_args: Dict[str, Any]) -> None:
         """Update configuration with CLI arguments"""
-        # Map CLI arguments to config structure
-        cli_mapping = {
-            "anthropic_api_key": ("anthropic", "api_key"),
-            "anthropic_model": ("anthropic", "model"),
-            "stability_api_key": ("stability", "api_key"),
-            "stability_model": ("stability", "model"),
-            "bfl_api_key": ("bfl", "api_key"),        # Add BFL mappings
-            "bfl_model": ("bfl", "model"),
-            "bfl_base_url": ("bfl", "base_url"),
-            "output_format": ("output", "format"),
-            "output_dir": ("output", "directory"),
-            "log_level": ("logging", "level"),
-            "log_file": ("logging", "file"),
-        }
-
-        for cli_arg, config_path in cli_mapping.items():
+        sections = self._ensure_sections()
+        for cli_arg, (section, key) in _CLI_MAPPING:
             if cli_arg in cli_args and cli_args[cli_arg] is not None:
-                self._set_nested_dict(self.config, config_path, cli_args[cli_arg])
+                sections[section][key] = cli_args[cli_arg]
 
-    def _set_nested_dict(self, d: dict, keys: tuple, value: Any) -> None:
-        """Set a value in a nested dictionary using a tuple of keys"""
-        for key in keys[:-1]:
-            d = d.setdefault(key, {})
-        d[keys[-1]] = value
+    def _ensure_sections(self) -> Dict[str, Dict[str, Any]]:
+        """Make sure every config section dict exists and return them by name"""
+        return {section: self.config.setdefault(section, {}) for section in _SECTIONS}
 
     def export_env(self, path: Union[str, Path]) -> None:
         """Export current configuration to .env file"""
@@ -185,7 +202,7 @@ class ConfigBuilder:
         path = Path(path)
         
         with open(path, "w") as f:
-            yaml.dump(self.config, f, default_flow_style=False)
+            yaml.dump(self.config, f, Dumper=_Dumper, default_flow_style=False)
 
     def build(self) -> AppConfig:
         """Build and validate the final configuration"""
@@ -1,23 +1,30 @@
 from pathlib import Path
-from typing import Dict, Any, Optional, Literal
+from typing import Dict, Any, Optional, Literal, Tuple
 import httpx
-from pydantic import (
-    BaseModel, 
-    Field, 
-    field_validator, 
-    model_validator, 
-    ValidationInfo
-)
-from sdprompt.utils.retry import with_retry, create_progress
-from rich.progress import Progress
+from pydantic import BaseModel, Field, model_validator
+import asyncio
 import logging
 import json
-import time
-from sdprompt.utils.hash import compute_file_hash
-import base64
+from sdprompt.utils.files import write_stream
+from sdprompt.utils.ratelimit import RateLimiter
+from sdprompt.utils import fastjson
 from enum import Enum
+from functools import lru_cache, cached_property
 from sdprompt.config import StabilityModel  # Import from config
 
+# Stability endpoint used for all SD3 / SD3.5 text-to-image requests
+_GENERATE_PATH = "/v2beta/stable-image/generate/sd3"
+
+# Longest Retry-After we wait out before retrying a rate-limited request, in seconds
+_MAX_RETRY_AFTER = 60.0
+
+# Supported Stability models by id, precomputed for O(1) validation
+_MODEL_BY_VALUE = {m.value: m for m in StabilityModel}
+_VALID_MODELS_STR = ", ".join(_MODEL_BY_VALUE)
+
+# Models that reject negative prompts
+_TURBO_MODELS = frozenset({StabilityModel.SD3_LARGE_TURBO, StabilityModel.SD35_LARGE_TURBO})
+
 class AspectRatio(str, Enum):
     """Valid aspect ratios for Stability AI API"""
     RATIO_16_9 = "16:9"
@@ -41,37 +48,63 @@ class ImageParameters(BaseModel):
     @model_validator(mode='after')
     def validate_and_clamp(self) -> 'ImageParameters':
         """Validate and clamp values to their allowed ranges"""
-        # Track if we made any adjustments
-        adjustments = []
+        cfg_scale = self.cfg_scale
+        clamped = min(max(cfg_scale, 1.0), 10.0)
 
-        # Clamp cfg_scale
-        if self.cfg_scale < 1.0:
-            adjustments.append(f"cfg_scale increased from {self.cfg_scale} to 1.0")
-            self.cfg_scale = 1.0
-        elif self.cfg_scale > 10.0:
-            adjustments.append(f"cfg_scale decreased from {self.cfg_scale} to 10.0")
-            self.cfg_scale = 10.0
-
-        # Log any adjustments
-        if adjustments:
-            logging.warning("Parameter adjustments made: " + "; ".join(adjustments))
+        if clamped != cfg_scale:
+            # The model is frozen, so bypass __setattr__
+            object.__setattr__(self, "cfg_scale", clamped)
+            if logging.getLogger().isEnabledFor(logging.WARNING):
+                logging.warning(f"Parameter adjustments made: cfg_scale clamped from {cfg_scale} to {clamped}")
 
         return self
 
     class Config:
         frozen = True
 
+    @cached_property
+    def as_dict(self) -> Dict[str, Any]:
+        """Serialized parameters, computed once per (immutable) instance"""
+        return self.model_dump()
+
+@lru_cache(maxsize=256)
+def _cached_image_parameters(items: tuple) -> ImageParameters:
+    return ImageParameters(**dict(items))
+
+def build_image_parameters(**kwargs: Any) -> ImageParameters:
+    """Build ImageParameters, reusing the validated instance for identical inputs"""
+    try:
+        return _cached_image_parameters(tuple(sorted(kwargs.items())))
+    except TypeError:
+        # Unhashable values can't be cached, validate directly
+        return ImageParameters(**kwargs)
+
+@lru_cache(maxsize=8)
+def _base_form(parameters: ImageParameters) -> Tuple[Tuple[str, Tuple[None, str]], ...]:
+    """Multipart fields derived from the (frozen) parameters, built once per instance"""
+    fields = [
+        ("output_format", (None, parameters.output_format)),
+        ("cfg_scale", (None, str(parameters.cfg_scale))),
+        ("aspect_ratio", (None, parameters.aspect_ratio.value)),
+    ]
+    if parameters.seed is not None:
+        fields.append(("seed", (None, str(parameters.seed))))
+    return tuple(fields)
+
 class ImageGenerator:
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, max_concurrency: int = 4):
         """
         Initialize image generator
         
         Args:
             api_key: Stability AI API key
             model: Model ID (e.g. "sd3.5-large", "sd3.5-large-turbo")
+            max_concurrency: Maximum number of in-flight generation requests
         """
         self.api_key = api_key
         self.model = self._normalize_model_id(model)
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._limiter = RateLimiter(_MAX_RETRY_AFTER)
         self.client = httpx.AsyncClient(
             base_url="https://api.stability.ai",
             headers={
@@ -80,20 +113,34 @@ class ImageGenerator:
                 "stability-client-id": "sdprompt",
                 "stability-client-version": "1.0.0"
             },
-            timeout=60.0
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(
+                max_keepalive_connections=16,
+                max_connections=32,
+                keepalive_expiry=60.0
+            ),
+            # Concurrent batch requests multiplex over one connection
+            http2=True
         )
 
+    async def aclose(self) -> None:
+        """Close the underlying HTTP client"""
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "ImageGenerator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
     def _normalize_model_id(self, model: str) -> str:
         """Validate model ID matches Stability AI's supported models"""
         model = model.lower().strip()
         
-        try:
-            return StabilityModel(model).value
-        except ValueError:
-            raise ValueError(
-                f"Invalid model: {model}. Must be one of: "
-                f"{', '.join(m.value for m in StabilityModel)}"
-            )
+        member = _MODEL_BY_VALUE.get(model)
+        if member is None:
+            raise ValueError(f"Invalid model: {model}. Must be one of: {_VALID_MODELS_STR}")
+        return member.value
 
     async def generate_image(
         self,
@@ -102,7 +149,10 @@ class ImageGenerator:
         parameters: ImageParameters,
         output_path: Path
     ) -> dict:
-        """Generate image from prompt using Stability AI API"""
+        """Generate image from prompt using Stability AI API
+
+        The parent directory of output_path must already exist.
+        """
         # Validate prompt length
         if len(prompt) > 10000:
             raise ValueError("Prompt must be 10000 characters or less")
@@ -110,76 +160,83 @@ class ImageGenerator:
             raise ValueError("Negative prompt must be 10000 characters or less")
 
         # Don't use negative prompt with turbo models
-        if negative_prompt and parameters.model in [StabilityModel.SD3_LARGE_TURBO, StabilityModel.SD35_LARGE_TURBO]:
+        if negative_prompt and parameters.model in _TURBO_MODELS:
             logging.warning("Negative prompts are not supported with turbo models. Ignoring negative prompt.")
             negative_prompt = ""
 
-        try:
-            # Prepare form data - only include parameters that SD accepts
-            form = {
-                "prompt": (None, prompt),
-                "output_format": (None, parameters.output_format),
-                "cfg_scale": (None, str(parameters.cfg_scale)),
-                "aspect_ratio": (None, parameters.aspect_ratio)
-            }
-
-            # Add seed if specified
-            if parameters.seed is not None:
-                form["seed"] = (None, str(parameters.seed))
-
-            # Add negative prompt if provided
-            if negative_prompt:
-                form["negative_prompt"] = (None, negative_prompt)
-
-            # Make API request with explicit timeout
-            response = await self.client.post(
-                "/v2beta/stable-image/generate/sd3",
-                files=form,
-                timeout=60.0
-            )
-            
-            # Check response status and get error details if any
-            if response.status_code != 200:
-                try:
-                    error_json = response.json()
-                    error_msg = error_json.get('message', str(response.status_code))
-                    raise RuntimeError(f"API Error: {error_msg}")
-                except json.JSONDecodeError:
-                    raise RuntimeError(f"API Error: {response.status_code} - {response.text}")
-            
-            # Extract seed from response headers
-            seed = response.headers.get("Seed")  # Note: header is capitalized
-            
-            # Save image directly from response content
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, "wb") as f:
-                f.write(response.content)
-            
-            # Create generation result with seed
-            result = {
-                "success": True,
-                "engine": self.model,
-                "generation_settings": parameters.dict()
-            }
+        # Bound the number of in-flight generations
+        async with self._sem:
+            try:
+                # Prepare form data - only include parameters that SD accepts
+                form = dict(_base_form(parameters))
+                form["prompt"] = (None, prompt)
+
+                # Add negative prompt if provided
+                if negative_prompt:
+                    form["negative_prompt"] = (None, negative_prompt)
+
+                # A 429 with a usable Retry-After is waited out and retried once
+                for attempt in range(2):
+                    # Honour any pause a previous response asked for
+                    await self._limiter.acquire()
+
+                    # Stream the response straight to disk (timeout and headers are client defaults)
+                    async with self.client.stream("POST", _GENERATE_PATH, files=form) as response:
+                        retry_after = self._limiter.update_from_headers(response.headers)
+                        if response.status_code == 429 and attempt == 0 and retry_after is not None:
+                            logging.warning(f"Rate limited by Stability AI, retrying in {retry_after:g}s")
+                            continue
+
+                        # Check response status and get error details if any
+                        if response.status_code != 200:
+                            body = await response.aread()
+                            error_msg = None
+                            # Only parse JSON when the server says it is JSON
+                            if response.headers.get("content-type", "").startswith("application/json"):
+                                try:
+                                    error_msg = fastjson.loads(body).get('message')
+                                except (json.JSONDecodeError, AttributeError):
+                                    pass
+                            if not error_msg:
+                                error_msg = body[:512].decode("utf-8", "replace")
+                            raise RuntimeError(f"API Error {response.status_code}: {error_msg}")
+
+                        # Extract seed from response headers
+                        seed = response.headers.get("Seed")  # Note: header is capitalized
+
+                        # Save image chunk by chunk, hashing as we go to avoid re-reading the file
+                        checksum = await write_stream(response, output_path)
+                    break
+
+                # Create generation result with seed
+                result = {
+                    "success": True,
+                    "engine": self.model,
+                    "checksum_sha256": checksum,
+                    # Copy so the seed update below doesn't touch the cached dump
+                    "generation_settings": dict(parameters.as_dict)
+                }
             
-            if seed:
-                try:
-                    result["generation_settings"]["seed"] = int(seed)
-                except ValueError:
-                    logging.warning(f"Invalid seed value in response: {seed}")
+                if seed:
+                    try:
+                        result["generation_settings"]["seed"] = int(seed)
+                    except ValueError:
+                        logging.warning(f"Invalid seed value in response: {seed}")
                 
-            return result
+                return result
                 
-        except httpx.TimeoutException as e:
-            raise RuntimeError(f"Request timed out after {e.request.timeout} seconds")
-        except httpx.HTTPError as e:
-            error_detail = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_json = e.response.json()
-                    error_detail = error_json.get('message', str(e))
-                except:
-                    error_detail = e.response.text
-            raise RuntimeError(f"HTTP error: {error_detail}")
-        except Exception as e:
-            raise RuntimeError(f"Failed to generate image: {str(e)}") 
\ No newline at end of file
+            except httpx.TimeoutException as e:
+                raise RuntimeError(f"Request timed out after {e.request.timeout} seconds")
+            except httpx.HTTPError as e:
+                error_detail = str(e)
+                if hasattr(e, 'response') and e.response is not None:
+                    try:
+                        error_json = fastjson.loads(e.response.content)
+                        error_detail = error_json.get('message', str(e))
+                    except (json.JSONDecodeError, AttributeError):
+                        error_detail = e.response.text
+                    except httpx.ResponseNotRead:
+                        pass  # Streamed body was never read; keep the exception text
+                raise RuntimeError(f"HTTP error: {error_detail}")
+            except Exception as e:
+                raise RuntimeError(f"Failed to generate image: {str(e)}") 
\ No newline at end of file
@@ -1,32 +1,88 @@
 import click
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
 from rich.console import Console
 from rich.traceback import install
 import asyncio
+import heapq
 import time
 import sys
-from functools import wraps
-import yaml
+from functools import lru_cache, wraps
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 import re
-from PIL import Image
+import textwrap
 from rich.table import Table
+from rich.progress import Progress
 from rich import box
 import os
 
 from sdprompt.config import load_config, ConfigBuilder
 from sdprompt.utils.logging import setup_logging
 from sdprompt.prompt_generator import PromptGenerator
-from sdprompt.image_generator import ImageGenerator, ImageParameters
-from sdprompt.metadata import MetadataHandler
-from sdprompt.utils.hash import compute_file_hash
-from sdprompt.utils.image import ImageVerifier
+from sdprompt.image_generator import ImageGenerator, build_image_parameters
+from sdprompt.metadata import MetadataHandler, read_metadata
+from sdprompt.utils.hash import cached_file_hash, compute_file_hash
+from sdprompt.utils.image import ImageVerifier, VerificationError
+
+# Run commands on uvloop's event loop when it is installed (it has no Windows support)
+try:
+    import uvloop
+    _LOOP_FACTORY = uvloop.new_event_loop
+except ImportError:
+    _LOOP_FACTORY = None
+
+# Filter expressions and size strings for the list command
+_FILTER_RE = re.compile(r'(\w+)(?:\.(\w+))?\s*([><=!]+|contains)\s*(.+)')
+_SIZE_RE = re.compile(r'^([\d.]+)\s*([kmgt]?b)?$')
+
+_SIZE_MULTIPLIERS = {
+    'b': 1,
+    'kb': 1024,
+    'mb': 1024 * 1024,
+    'gb': 1024 * 1024 * 1024,
+    'tb': 1024 * 1024 * 1024 * 1024
+}
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Comparison operators supported in filter expressions
+_OPS = {
+    '>': lambda x, y: float(x) > float(y),
+    '<': lambda x, y: float(x) < float(y),
+    '>=': lambda x, y: float(x) >= float(y),
+    '<=': lambda x, y: float(x) <= float(y),
+    '=': lambda x, y: str(x).lower() == str(y).lower(),
+    '!=': lambda x, y: str(x).lower() != str(y).lower(),
+    'contains': lambda x, y: str(y).lower() in str(x).lower(),
+}
+
+# Below this many metadata files, process startup costs more than parsing
+_PARALLEL_LOAD_MIN_FILES = 64
 
 # Install rich traceback handler
 install()
 console = Console()
 
+def _scan_directory(dir_path: Path) -> tuple:
+    """Walk a directory once, returning (yaml_paths, {stem: png DirEntry})"""
+    yaml_files, png_entries = [], {}
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            # Hidden files are kept, as Path.glob('*.yaml') returns them too
+            if entry.name.endswith('.yaml'):
+                yaml_files.append(Path(entry.path))
+            elif entry.name.endswith('.png'):
+                png_entries[entry.name[:-4]] = entry
+    return yaml_files, png_entries
+
+def _load_metadata(yaml_file: Path) -> tuple:
+    """Parse a metadata file, returning (stem, metadata, error)"""
+    try:
+        return yaml_file.stem, read_metadata(yaml_file), None
+    except Exception as e:
+        return yaml_file.stem, None, str(e)
+
 @click.group()
 @click.version_option()
 def cli():
@@ -37,7 +93,7 @@ def coro(f):
     """Decorator to handle coroutines in click commands"""
     @wraps(f)
     def wrapper(*args, **kwargs):
-        return asyncio.run(f(*args, **kwargs))
+        return asyncio.run(f(*args, **kwargs), loop_factory=_LOOP_FACTORY)
     return wrapper
 
 def format_path(path: Path) -> str:
@@ -47,6 +103,19 @@ def format_path(path: Path) -> str:
     except ValueError:
         return str(path)
 
+def print_summary(prompt_data: dict) -> None:
+    """Print the generated prompt and parameters"""
+    console.print("\nGenerated prompt:")
+    console.print(f"[blue]{prompt_data['generation']['prompt']}[/blue]")
+
+    if prompt_data['generation']['negative_prompt']:
+        console.print("\nNegative prompt:")
+        console.print(f"[red]{prompt_data['generation']['negative_prompt']}[/red]")
+
+    console.print("\nParameters:")
+    for key, value in prompt_data['generation']['parameters'].items():
+        console.print(f"  {key}: {value}")
+
 @cli.command(name="generate")
 @click.argument('prompt', type=str, required=False, default='-')
 @click.option(
@@ -111,6 +180,11 @@ def format_path(path: Path) -> str:
     is_flag=True,
     help="Open the generated image in the system's default application"
 )
+@click.option(
+    "--prompt-cache",
+    is_flag=True,
+    help="Reuse a cached Claude analysis of the same prompt (kept for 30 days, without its seed)"
+)
 @coro
 async def generate(
     prompt: str,
@@ -126,8 +200,14 @@ async def generate(
     verbose: bool,
     platform: str,
     open: bool,
+    prompt_cache: bool,
 ):
-    """Generate images from prompts. Accepts prompt as argument or via stdin."""
+    """Generate images from prompts. Accepts prompt as argument or via stdin.
+
+    Prompts may be at most 999 characters long.
+    """
+    prompt_generator = None
+    image_generator = None
     try:
         # Get user prompt from argument or stdin
         if prompt == '-':
@@ -166,25 +246,29 @@ async def generate(
         # Initialize components
         prompt_generator = PromptGenerator(
             api_key=app_config.anthropic.api_key,
-            model=app_config.anthropic.model
+            model=app_config.anthropic.model,
+            use_cache=prompt_cache
         )
         
         # Initialize image generator based on platform
         if platform == "stability":
             image_generator = ImageGenerator(
                 api_key=app_config.stability.api_key,
-                model=app_config.stability.model
+                model=app_config.stability.model,
+                max_concurrency=app_config.stability.max_concurrency
             )
         else:  # bfl
-            from sdprompt.bfl_generator import BFLGenerator, BFLParameters
+            from sdprompt.bfl_generator import BFLGenerator
             image_generator = BFLGenerator(
                 api_key=app_config.bfl.api_key,
                 model=app_config.bfl.model,
-                base_url=app_config.bfl.base_url
+                base_url=app_config.bfl.base_url,
+                max_concurrency=app_config.bfl.max_concurrency
             )
         
         metadata_handler = MetadataHandler(
-            output_dir=Path(app_config.output.directory)
+            output_dir=Path(app_config.output.directory),
+            platform=platform
         )
         
         # Generate timestamp prefix for this batch
@@ -196,49 +280,35 @@ async def generate(
         prompt_data = await prompt_generator.analyze_prompt(user_prompt)
         
         console.print("[green]Prompt analysis complete[/green]")
-        console.print("\nGenerated prompt:")
-        console.print(f"[blue]{prompt_data['generation']['prompt']}[/blue]")
         
-        if prompt_data['generation']['negative_prompt']:
-            console.print("\nNegative prompt:")
-            console.print(f"[red]{prompt_data['generation']['negative_prompt']}[/red]")
-            
-        console.print("\nParameters:")
-        for key, value in prompt_data['generation']['parameters'].items():
-            console.print(f"  {key}: {value}")
-            
         if dry_run:
+            print_summary(prompt_data)
             console.print("\n[yellow]Dry run - skipping image generation[/yellow]")
             return
             
-        # Generate images
-        for i in range(count):
-            # Generate sequence number with padding
-            seq_num = str(i + 1).zfill(3)
-            
+        output_dir = Path(app_config.output.directory)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Validate parameters once; the models are frozen and shared by every image
+        if platform == "stability":
+            parameters = build_image_parameters(**prompt_data["generation"]["parameters"])
+        else:  # bfl
+            from sdprompt.bfl_generator import build_bfl_parameters
+            # BFL only needs width and height
+            parameters = build_bfl_parameters(
+                width=1024,  # Default or get from prompt_data if available
+                height=1024,
+                model=app_config.bfl.model
+            )
+
+        async def generate_one(i: int) -> Path:
+            """Generate a single image and its metadata, returning the image path"""
             # Generate unique filename: timestamp_sequence.ext
-            output_filename = f"{timestamp}_{seq_num}"
-            
-            # Get full paths for output files
-            image_path = Path(app_config.output.directory) / f"{output_filename}.{format}"
-            metadata_path = Path(app_config.output.directory) / f"{output_filename}.yaml"
+            image_path = output_dir / f"{timestamp}_{i + 1:03d}.{format}"
             
-            console.print(f"\n[yellow]Generating image {i+1} of {count}...[/yellow]")
-            
-            start_time = time.time()
+            start_time = time.perf_counter()
             
             # Generate image
-            if platform == "stability":
-                parameters = ImageParameters(**prompt_data["generation"]["parameters"])
-            else:  # bfl
-                from sdprompt.bfl_generator import BFLParameters
-                # BFL only needs width and height
-                parameters = BFLParameters(
-                    width=1024,  # Default or get from prompt_data if available
-                    height=1024,
-                    model=app_config.bfl.model
-                )
-
             generation_result = await image_generator.generate_image(
                 prompt=prompt_data["generation"]["prompt"],
                 negative_prompt=prompt_data["generation"]["negative_prompt"],
@@ -246,20 +316,21 @@ async def generate(
                 output_path=image_path
             )
             
-            generation_time = time.time() - start_time
+            generation_time = time.perf_counter() - start_time
             generation_result["generation_time"] = generation_time
             
-            # Save metadata using MetadataHandler
-            metadata_handler.save_metadata(
+            # Save metadata in a worker thread so other images' requests keep flowing
+            await asyncio.to_thread(
+                metadata_handler.save_metadata,
                 image_path=image_path,
                 prompt_data=prompt_data,
                 generation_result=generation_result,
                 original_prompt=user_prompt
             )
-            
-            # Show paths to both files
+
+            # Report each image as it completes; no await between prints keeps them grouped
             console.print(f"[green]Generated {format_path(image_path)}[/green]")
-            console.print(f"[blue]Metadata saved to {format_path(metadata_path)}[/blue]")
+            console.print(f"[blue]Metadata saved to {format_path(image_path.with_suffix('.yaml'))}[/blue]")
             
             # Open the image if the --open flag is set
             if open:
@@ -270,12 +341,44 @@ async def generate(
                     os.startfile(image_path)
                 elif os.name == 'posix':
                     os.system(f"xdg-open {image_path}")
+            return image_path
+
+        tasks = []
+        try:
+            # Any failure cancels the remaining images so no further credits are spent
+            async with asyncio.TaskGroup() as tg:
+                # Dispatch all images at once; the generator's semaphore bounds concurrency
+                tasks = [tg.create_task(generate_one(i)) for i in range(count)]
+                # Let the requests go out before spending time on console output
+                await asyncio.sleep(0)
+
+                print_summary(prompt_data)
+                console.print(f"\n[yellow]Generating {count} image(s)...[/yellow]")
+        except* Exception as eg:
+            errors = eg.exceptions
+        else:
+            errors = ()
+
+        for i, task in enumerate(tasks):
+            if not task.cancelled() and task.exception() is not None:
+                console.print(f"[red]Image {i+1} of {count} failed: {task.exception()}[/red]")
+
+        if errors:
+            raise RuntimeError(
+                f"{len(errors)} of {count} images failed to generate; remaining images were cancelled"
+            )
             
         console.print("\n[green]All images generated successfully![/green]")
         
     except Exception as e:
         console.print(f"[red]Error: {str(e)}[/red]")
         raise click.Abort()
+    finally:
+        # Release pooled connections held by the generators
+        if image_generator is not None:
+            await image_generator.aclose()
+        if prompt_generator is not None:
+            await prompt_generator.aclose()
 
 @cli.command()
 @click.option(
@@ -417,119 +520,170 @@ def config(
 @click.argument('metadata_file', type=click.Path(exists=True))
 @click.option('-v', '--verbose', is_flag=True, help='Enable verbose output')
 @click.option('--max-age', type=int, help='Maximum age in seconds')
-def verify(metadata_file: str, verbose: bool, max_age: int = None):
+@click.option('--hash-cache', is_flag=True, help='Reuse checksums of files unchanged since the last run (skips re-reading them, so bit rot goes unnoticed)')
+def verify(metadata_file: str, verbose: bool, max_age: int = None, hash_cache: bool = False):
     """Verify an image against its metadata"""
     try:
         metadata_path = Path(metadata_file)
         if not metadata_path.suffix == '.yaml':
             raise click.BadParameter("Metadata file must be a YAML file")
             
-        # Load metadata
-        with open(metadata_path) as f:
-            metadata = yaml.safe_load(f)
-            
-        if verbose:
-            click.echo("Metadata loaded successfully")
-            
-        # Get image path
-        image_name = metadata_path.stem + '.png'
-        image_path = metadata_path.parent / image_name
+        _verify_impl(metadata_path, max_age, verbose=verbose, hash_cache=hash_cache)
+        click.echo("✅ Image verification successful!")
         
-        if not image_path.exists():
-            raise click.ClickException(f"Image file not found: {image_path}")
-            
-        if verbose:
-            click.echo(f"Checking image: {image_path}")
+    except Exception as e:
+        raise click.ClickException(str(e))
+
+def _verify_impl(
+    metadata_path: Path, max_age: Optional[int], verbose: bool = False, hash_cache: bool = False
+) -> None:
+    """Verify an image against its metadata, raising VerificationError on mismatch"""
+    # Load metadata
+    metadata = read_metadata(metadata_path)
+        
+    if verbose:
+        click.echo("Metadata loaded successfully")
+        
+    # Get image path
+    image_name = metadata_path.stem + '.png'
+    image_path = metadata_path.parent / image_name
+    
+    # One stat both confirms the image exists and gives its size
+    try:
+        image_stat = image_path.stat()
+    except FileNotFoundError:
+        raise VerificationError(f"Image file not found: {image_path}")
+        
+    if verbose:
+        click.echo(f"Checking image: {image_path}")
+        
+    # Get expected values
+    expected = metadata.get('image_info', {})
+    generation_info = metadata.get('generation_info', {})
+    
+    # Read the header once for both the dimension and format checks
+    if 'dimensions' in expected or 'format' in expected:
+        actual_width, actual_height, actual_format = ImageVerifier.read_header(image_path)
+        
+    # Verify dimensions
+    if 'dimensions' in expected:
+        width, height = map(int, expected['dimensions'].split('x'))
+        if not ImageVerifier.check_dimensions((actual_width, actual_height), width, height):
+            raise VerificationError("Image dimensions do not match metadata")
             
-        # Get expected values
-        expected = metadata.get('image_info', {})
-        generation_info = metadata.get('generation_info', {})
-        
-        # Verify dimensions
-        if 'dimensions' in expected:
-            width, height = map(int, expected['dimensions'].split('x'))
-            if not ImageVerifier.verify_dimensions(image_path, width, height):
-                raise click.ClickException("Image dimensions do not match metadata")
-                
-        # Verify format
-        if 'format' in expected:
-            if not ImageVerifier.verify_format(image_path, expected['format']):
-                raise click.ClickException("Image format does not match metadata")
-                
-        # Verify timestamp
-        if 'timestamp' in metadata:
-            if not ImageVerifier.verify_timestamp(metadata['timestamp'], max_age):
-                raise click.ClickException("Image timestamp verification failed")
-                
-        # Verify file size
-        actual_size = image_path.stat().st_size
-        if 'file_size_bytes' in expected and actual_size != expected['file_size_bytes']:
-            if verbose:
-                click.echo(f"Expected size: {expected['file_size_bytes']:,} bytes")
-                click.echo(f"Actual size: {actual_size:,} bytes")
-            raise click.ClickException(
-                f"File size mismatch: expected {expected['file_size_bytes']:,}, got {actual_size:,}"
-            )
+    # Verify format
+    if 'format' in expected:
+        if not ImageVerifier.check_format(actual_format, expected['format']):
+            raise VerificationError("Image format does not match metadata")
             
-        # Verify checksum
-        actual_hash = compute_file_hash(image_path)
-        if 'checksum_sha256' in expected and actual_hash != expected['checksum_sha256']:
-            if verbose:
-                click.echo(f"Expected hash: {expected['checksum_sha256']}")
-                click.echo(f"Actual hash: {actual_hash}")
-            raise click.ClickException(
-                f"Checksum mismatch:\nExpected: {expected['checksum_sha256']}\nActual:   {actual_hash}"
-            )
+    # Verify timestamp
+    if 'timestamp' in metadata:
+        if not ImageVerifier.verify_timestamp(metadata['timestamp'], max_age):
+            raise VerificationError("Image timestamp verification failed")
             
+    # Verify file size
+    actual_size = image_stat.st_size
+    if 'file_size_bytes' in expected and actual_size != expected['file_size_bytes']:
         if verbose:
-            click.echo("\nVerification Results:")
-            click.echo(f"Image path: {image_path}")
-            click.echo(f"Format: {expected.get('format', 'unknown')}")
-            click.echo(f"Dimensions: {expected.get('dimensions', 'unknown')}")
-            click.echo(f"File size: {actual_size:,} bytes")
-            click.echo(f"SHA256: {actual_hash}")
-            click.echo(f"Generated by: {generation_info.get('engine', 'unknown')}")
-            
-        click.echo("✅ Image verification successful!")
+            click.echo(f"Expected size: {expected['file_size_bytes']:,} bytes")
+            click.echo(f"Actual size: {actual_size:,} bytes")
+        raise VerificationError(
+            f"File size mismatch: expected {expected['file_size_bytes']:,}, got {actual_size:,}"
+        )
+        
+    # Verify checksum, skipping the hash entirely when there is nothing to compare against
+    actual_hash = None
+    if 'checksum_sha256' in expected:
+        # Read the whole file unless asked to trust stat metadata
+        actual_hash = cached_file_hash(image_path) if hash_cache else compute_file_hash(image_path)
+    if actual_hash is not None and actual_hash != expected['checksum_sha256']:
+        if verbose:
+            click.echo(f"Expected hash: {expected['checksum_sha256']}")
+            click.echo(f"Actual hash: {actual_hash}")
+        raise VerificationError(
+            f"Checksum mismatch:\nExpected: {expected['checksum_sha256']}\nActual:   {actual_hash}"
+        )
         
+    if verbose:
+        click.echo("\nVerification Results:")
+        click.echo(f"Image path: {image_path}")
+        click.echo(f"Format: {expected.get('format', 'unknown')}")
+        click.echo(f"Dimensions: {expected.get('dimensions', 'unknown')}")
+        click.echo(f"File size: {actual_size:,} bytes")
+        click.echo(f"SHA256: {actual_hash or 'not recorded'}")
+        click.echo(f"Generated by: {generation_info.get('engine', 'unknown')}")
+
+def _verify_file(yaml_file: str, max_age: Optional[int], hash_cache: bool = False) -> tuple:
+    """Verify one metadata file, returning (stem, success, error)"""
+    path = Path(yaml_file)
+    try:
+        _verify_impl(path, max_age, hash_cache=hash_cache)
+        return (path.stem, True, None)
     except Exception as e:
-        raise click.ClickException(str(e))
+        return (path.stem, False, str(e))
 
 @cli.command()
 @click.argument('directory', type=click.Path(exists=True, file_okay=False, dir_okay=True))
 @click.option('-v', '--verbose', is_flag=True, help='Enable verbose output')
-@click.option('-j', '--jobs', type=int, default=1, help='Number of parallel jobs')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), help='Number of parallel jobs (default: CPU count)')
 @click.option('--max-age', type=int, help='Maximum age in seconds')
-def verify_all(directory: str, verbose: bool, jobs: int, max_age: int = None):
+@click.option('--fail-fast', is_flag=True, help='Stop at the first failed verification')
+@click.option('--hash-cache', is_flag=True, help='Reuse checksums of files unchanged since the last run (skips re-reading them, so bit rot goes unnoticed)')
+def verify_all(
+    directory: str,
+    verbose: bool,
+    jobs: Optional[int],
+    max_age: int = None,
+    fail_fast: bool = False,
+    hash_cache: bool = False,
+):
     """Verify all images in a directory"""
     try:
-        from rich.table import Table
-        from concurrent.futures import ThreadPoolExecutor
-        import concurrent.futures
+        # Verification is hash-bound, so use every core unless told otherwise
+        jobs = jobs or os.cpu_count() or 1
         
         dir_path = Path(directory)
-        yaml_files = list(dir_path.glob('*.yaml'))
+        yaml_files, png_entries = _scan_directory(dir_path)
         
         if not yaml_files:
             raise click.ClickException(f"No YAML files found in {directory}")
             
+        def image_size(yaml_file: Path) -> int:
+            entry = png_entries.get(yaml_file.stem)
+            try:
+                return entry.stat().st_size if entry is not None else 0
+            except OSError:
+                return 0
+                
+        # Smallest images hash fastest, so failures surface early
+        yaml_files.sort(key=image_size)
+        
         results = []
         console.print(f"Verifying {len(yaml_files)} images...")
         
-        def verify_file(yaml_file):
-            try:
-                verify(str(yaml_file), verbose=False, max_age=max_age)
-                return (str(yaml_file.stem), True, None)
-            except Exception as e:
-                return (str(yaml_file.stem), False, str(e))
+        # Hashing is CPU-bound, so parallel runs use processes to get past the GIL
+        if jobs > 1 and len(yaml_files) > 4:
+            executor_class = ProcessPoolExecutor
+        else:
+            executor_class = ThreadPoolExecutor
                 
-        with ThreadPoolExecutor(max_workers=jobs) as executor:
-            future_to_file = {executor.submit(verify_file, f): f for f in yaml_files}
-            for future in concurrent.futures.as_completed(future_to_file):
-                results.append(future.result())
+        with executor_class(max_workers=jobs) as executor:
+            future_to_file = {executor.submit(_verify_file, str(f), max_age, hash_cache): f for f in yaml_files}
+            # Report progress and failures as they land instead of after the whole run
+            with Progress(console=console, transient=True) as progress:
+                task = progress.add_task("Verifying", total=len(yaml_files))
+                for future in as_completed(future_to_file):
+                    result = future.result()
+                    results.append(result)
+                    progress.advance(task)
+                    if not result[1]:
+                        progress.console.print(f"[red]❌ {result[0]}: {result[2]}[/red]")
+                        if fail_fast:
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            break
                 
         # Show summary
-        success = sum(1 for _, success, _ in results if success)
+        success = sum(1 for _, ok, _ in results if ok)
         
         if verbose:
             table = Table(title="Verification Results")
@@ -537,8 +691,8 @@ def verify_all(directory: str, verbose: bool, jobs: int, max_age: int = None):
             table.add_column("Status")
             table.add_column("Error", style="red")
             
-            for file_name, success, error in results:
-                status = "✅" if success else "❌"
+            for file_name, ok, error in sorted(results):
+                status = "✅" if ok else "❌"
                 table.add_row(
                     file_name,
                     status,
@@ -566,16 +720,13 @@ def verify_all(directory: str, verbose: bool, jobs: int, max_age: int = None):
 )
 @click.option('--sort', type=click.Choice(['date', 'size', 'model']), help='Sort results')
 @click.option('--reverse', is_flag=True, help='Reverse sort order')
+@click.option('--limit', type=click.IntRange(min=1), help='Show at most this many images')
 @click.option('-v', '--verbose', is_flag=True, help='Show detailed information')
-def list(directory: str, filter: str, sort: str, reverse: bool, verbose: bool):
+def list(directory: str, filter: str, sort: str, reverse: bool, limit: Optional[int], verbose: bool):
     """List and query generated images"""
     try:
-        from rich.table import Table
-        from rich.style import Style
-        import re
-        
         dir_path = Path(directory)
-        yaml_files = [f for f in dir_path.glob('*.yaml')]
+        yaml_files, png_entries = _scan_directory(dir_path)
         
         if not yaml_files:
             raise click.ClickException(f"No YAML files found in {directory}")
@@ -584,23 +735,29 @@ def list(directory: str, filter: str, sort: str, reverse: bool, verbose: bool):
         entries = []
         console.print(f"Loading metadata for {len(yaml_files)} files...")
         
-        for yaml_file in yaml_files:
-            try:
-                with open(yaml_file) as f:
-                    metadata = yaml.safe_load(f)
-                    entries.append((str(yaml_file.stem), metadata))
-            except Exception as e:
-                console.print(f"[red]Error loading {yaml_file.name}: {str(e)}[/red]")
+        # YAML parsing is CPU-bound, so large directories are spread across processes
+        if len(yaml_files) >= _PARALLEL_LOAD_MIN_FILES:
+            with ProcessPoolExecutor() as executor:
+                loaded = [*executor.map(_load_metadata, yaml_files, chunksize=16)]
+        else:
+            loaded = [_load_metadata(f) for f in yaml_files]
+
+        for file_name, metadata, error in loaded:
+            if error is not None:
+                console.print(f"[red]Error loading {file_name}.yaml: {error}[/red]")
+            else:
+                entries.append((file_name, metadata))
                 
         if not entries:
             raise click.ClickException("No valid metadata files found")
             
         # Apply filters if specified
         if filter:
+            matches = compile_filter(filter)
             filtered = []
             for file_name, metadata in entries:
                 try:
-                    if eval_filter(filter, metadata):
+                    if matches(metadata):
                         filtered.append((file_name, metadata))
                 except Exception as e:
                     console.print(f"[yellow]Warning: Filter error for {file_name}: {e}[/yellow]")
@@ -608,10 +765,16 @@ def list(directory: str, filter: str, sort: str, reverse: bool, verbose: bool):
             
         # Sort results
         if sort:
-            entries.sort(
-                key=lambda x: get_sort_key(x[1], sort),
-                reverse=reverse
-            )
+            sort_key = lambda x: get_sort_key(x[1], sort)
+            if limit is not None and limit < len(entries):
+                # Select the top rows with a heap rather than sorting rows that won't be shown
+                select = heapq.nlargest if reverse else heapq.nsmallest
+                entries = select(limit, entries, key=sort_key)
+            else:
+                entries.sort(key=sort_key, reverse=reverse)
+                
+        if limit is not None:
+            entries = entries[:limit]
             
         # Display results
         table = Table(
@@ -647,118 +810,15 @@ def list(directory: str, filter: str, sort: str, reverse: bool, verbose: bool):
         for name, settings in cols:
             table.add_column(name, **settings)
             
-        # Format model display more compactly
-        def format_model_info(anthropic: str, stability: str) -> str:
-            parts = []
-            if anthropic != 'Unknown':
-                model_parts = anthropic.split('-')
-                parts.append(f"[cyan]A:[/cyan] {model_parts[0]}")
-                if len(model_parts) > 1:
-                    parts.append(f"   {'-'.join(model_parts[1:])}")
-            else:
-                parts.append(f"[cyan]A:[/cyan] Unknown")
-                
-            if stability != 'Unknown':
-                parts.append(f"[cyan]S:[/cyan] {stability}")
-            else:
-                parts.append(f"[cyan]S:[/cyan] Unknown")
-                
-            return "\n".join(parts)
-        
         for file_name, metadata in entries:
-            image_info = metadata.get('image_info', {})
-            gen_info = metadata.get('generation_info', {})
-            
-            # Format status with fixed width
-            status = get_image_status(file_name, dir_path, metadata)
-            status = f"{status:10}"  # Ensure consistent width
-            
-            # Format filename with fixed width
-            file_display = f"{file_name:12}"
-            
-            # Format timestamp with consistent width
-            timestamp = metadata.get('timestamp')  # Get timestamp from metadata first
-            if isinstance(timestamp, datetime):
-                timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            elif not isinstance(timestamp, str):
-                timestamp = 'Unknown'
-            timestamp = f"{timestamp:20}"
-            
-            # Get dimensions from metadata or actual image
-            dimensions = image_info.get('dimensions', '')
-            if not dimensions or dimensions == 'Unknown':
-                try:
-                    image_path = dir_path / f"{file_name}.png"
-                    if image_path.exists():
-                        with Image.open(image_path) as img:
-                            dimensions = f"{img.width}x{img.height}"
-                except Exception:
-                    dimensions = 'Unknown'
-            
-            # Get file size from both metadata and actual file
-            size = image_info.get('file_size_bytes', 0)
-            try:
-                image_path = dir_path / f"{file_name}.png"
-                if image_path.exists():
-                    size = image_path.stat().st_size
-            except Exception:
-                pass
-            
-            # Get model information with versions
-            anthropic_model = gen_info.get('model', 'Unknown')
-            stability_model = gen_info.get('engine', 'Unknown')
-            
-            # Format model display
-            model_display = format_model_info(
-                gen_info.get('model', 'Unknown'),
-                gen_info.get('engine', 'Unknown')
-            )
-            
-            # Format prompt with better wrapping
-            if verbose:
-                prompt = str(metadata.get('original_prompt', 'N/A'))
-                if len(prompt) > 37:  # Adjusted for new width
-                    words = prompt.split()
-                    lines = []
-                    current_line = []
-                    current_length = 0
-                    
-                    for word in words:
-                        if current_length + len(word) + 1 <= 37:
-                            current_line.append(word)
-                            current_length += len(word) + 1
-                        else:
-                            lines.append(" ".join(current_line))
-                            current_line = [word]
-                            current_length = len(word)
-                            
-                    if current_line:
-                        lines.append(" ".join(current_line))
-                    prompt = "\n".join(lines)
-                
-            row = [
-                status,
-                file_display,
-                timestamp,
-                format_size(size),
-                format_dimensions(dimensions),
-                model_display
-            ]
-            
-            if verbose:
-                settings_text = format_settings(gen_info.get('generation_settings', {}))
-                row.extend([
-                    prompt,
-                    settings_text if settings_text else "No settings available"
-                ])
-                
-            table.add_row(*row)
+            table.add_row(*_row_fields(file_name, metadata, dir_path, png_entries.get(file_name), verbose))
             
         console.print(table)
         
-        # Show summary if filtering was applied
+        # Show summary if filtering or a limit was applied
         if filter:
             console.print("\n[yellow]Filter applied: " + filter + "[/yellow]")
+        if filter or limit is not None:
             console.print(f"[yellow]Showing {len(entries)} of {len(yaml_files)} images[/yellow]")
         
     except Exception as e:
@@ -767,83 +827,74 @@ def list(directory: str, filter: str, sort: str, reverse: bool, verbose: bool):
 def parse_size(size_str: str) -> int:
     """Convert size string with units to bytes"""
     size_str = size_str.strip().lower()
-    multipliers = {
-        'b': 1,
-        'kb': 1024,
-        'mb': 1024 * 1024,
-        'gb': 1024 * 1024 * 1024,
-        'tb': 1024 * 1024 * 1024 * 1024
-    }
+    if size_str.isdigit():
+        return int(size_str)  # Plain byte count, no unit to parse
     
     # Try to match number and unit
-    import re
-    match = re.match(r'^([\d.]+)\s*([kmgt]?b)?$', size_str)
+    match = _SIZE_RE.match(size_str)
     if not match:
         return int(size_str)  # Try plain number
         
     number, unit = match.groups()
     unit = unit or 'b'  # Default to bytes if no unit
     
-    return int(float(number) * multipliers[unit])
+    return int(float(number) * _SIZE_MULTIPLIERS[unit])
 
-def eval_filter(expr: str, metadata: dict) -> bool:
-    """Evaluate a filter expression against metadata"""
-    import re
-    
-    # Define comparison operators
-    ops = {
-        '>': lambda x, y: float(x) > float(y),
-        '<': lambda x, y: float(x) < float(y),
-        '>=': lambda x, y: float(x) >= float(y),
-        '<=': lambda x, y: float(x) <= float(y),
-        '=': lambda x, y: str(x).lower() == str(y).lower(),
-        '!=': lambda x, y: str(x).lower() != str(y).lower(),
-        'contains': lambda x, y: str(y).lower() in str(x).lower(),
-    }
-    
-    # Parse expression
-    match = re.match(r'(\w+)(?:\.(\w+))?\s*([><=!]+|contains)\s*(.+)', expr)
-    if not match:
+def compile_filter(expr: str) -> Callable[[dict], bool]:
+    """Parse a filter expression once into a predicate over metadata"""
+    match = _FILTER_RE.match(expr)
+    if not match or match.group(3) not in _OPS:
         raise ValueError(f"Invalid filter expression: {expr}")
         
     field, subfield, op, value = match.groups()
     value = value.strip('"\'')  # Remove quotes
+    compare = _OPS[op]
     
-    # Get field value from metadata
-    try:
-        if field == 'size':
-            data = metadata.get('image_info', {}).get('file_size_bytes', 0)
-            try:
-                value = parse_size(value)  # Convert size string to bytes
-            except ValueError:
-                return False
-        elif field == 'dimensions':
-            data = metadata.get('image_info', {}).get('dimensions', '')
-            if not data or data == 'Unknown':
-                width = metadata.get('image_info', {}).get('width', 0)
-                height = metadata.get('image_info', {}).get('height', 0)
-                if width and height:
-                    data = f"{width}x{height}"
-                else:
+    if field == 'size':
+        try:
+            value = parse_size(value)  # Convert size string to bytes
+        except ValueError:
+            return lambda metadata: False
+    value = str(value)
+    
+    def predicate(metadata: dict) -> bool:
+        # Get field value from metadata
+        try:
+            if field == 'size':
+                data = metadata.get('image_info', {}).get('file_size_bytes', 0)
+            elif field == 'dimensions':
+                data = metadata.get('image_info', {}).get('dimensions', '')
+                if not data or data == 'Unknown':
+                    width = metadata.get('image_info', {}).get('width', 0)
+                    height = metadata.get('image_info', {}).get('height', 0)
+                    if width and height:
+                        data = f"{width}x{height}"
+                    else:
+                        return False
+            elif field == 'prompt':
+                data = metadata.get('original_prompt', '')
+                if not data:
                     return False
-        elif field == 'prompt':
-            data = metadata.get('original_prompt', '')
-            if not data:
-                return False
-        else:
-            data = metadata[field]
-            if subfield:
-                data = data.get(subfield)
-            if data is None:
-                return False
+            else:
+                data = metadata[field]
+                if subfield:
+                    data = data.get(subfield)
+                if data is None:
+                    return False
+                
+        except (KeyError, TypeError):
+            return False
             
-    except (KeyError, TypeError):
-        return False
-        
-    try:
-        return ops[op](str(data), str(value))
-    except (ValueError, TypeError):
-        return False
+        try:
+            return compare(str(data), value)
+        except (ValueError, TypeError):
+            return False
+            
+    return predicate
+
+def eval_filter(expr: str, metadata: dict) -> bool:
+    """Evaluate a filter expression against metadata"""
+    return compile_filter(expr)(metadata)
 
 def get_sort_key(metadata: dict, sort_field: str):
     """Get sort key from metadata"""
@@ -859,24 +910,103 @@ def format_size(size_bytes: int) -> str:
     """Format file size in human readable format with color"""
     try:
         size_bytes = int(size_bytes)  # Ensure integer
-        if size_bytes == 0:
+        if size_bytes <= 0:
             return "[red]Unknown[/red]"
             
+        # Each unit is 2**10 of the previous, so the bit length picks the unit directly
+        idx = min((size_bytes.bit_length() - 1) // 10, 4)
+        scaled = size_bytes / (1 << (idx * 10))
+        
         # Color code based on size
-        color = "green"
-        if size_bytes > 10 * 1024 * 1024:  # > 10MB
+        if size_bytes > 10 << 20:  # > 10MB
             color = "red"
-        elif size_bytes > 5 * 1024 * 1024:  # > 5MB
+        elif size_bytes > 5 << 20:  # > 5MB
             color = "yellow"
-            
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024:
-                return f"[{color}]{size_bytes:,.1f} {unit}[/{color}]"
-            size_bytes /= 1024
-        return f"[red]{size_bytes:,.1f} TB[/red]"
+        else:
+            color = "green"
+        return f"[{color}]{scaled:,.1f} {_SIZE_UNITS[idx]}[/{color}]"
     except (TypeError, ValueError):
         return "[red]Unknown[/red]"
 
+def _row_fields(
+    file_name: str,
+    metadata: dict,
+    dir_path: Path,
+    image_entry: Optional[os.DirEntry],
+    verbose: bool
+) -> tuple:
+    """Build the formatted cells for one row of the list table"""
+    image_info = metadata.get('image_info') or {}
+    gen_info = metadata.get('generation_info') or {}
+    
+    # The scandir entry caches its stat on most filesystems
+    try:
+        image_stat = image_entry.stat() if image_entry is not None else None
+    except OSError:
+        image_stat = None
+    
+    # Format timestamp from metadata
+    timestamp = metadata.get('timestamp')
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
+    elif not isinstance(timestamp, str):
+        timestamp = 'Unknown'
+    
+    # Get dimensions from metadata or actual image
+    dimensions = image_info.get('dimensions', '')
+    if (not dimensions or dimensions == 'Unknown') and image_stat is not None:
+        image_path = dir_path / f"{file_name}.png"
+        try:
+            width, height, _ = ImageVerifier.read_header(image_path)
+            dimensions = f"{width}x{height}"
+        except Exception:
+            dimensions = 'Unknown'
+    
+    # Prefer the actual file size over the recorded one
+    size = image_stat.st_size if image_stat is not None else image_info.get('file_size_bytes', 0)
+    
+    # Fixed-width cells keep the columns aligned
+    row = (
+        get_image_status(image_stat, metadata).ljust(10),
+        file_name.ljust(12),
+        timestamp.ljust(20),
+        format_size(size),
+        format_dimensions(dimensions),
+        format_model_info(gen_info.get('model', 'Unknown'), gen_info.get('engine', 'Unknown'))
+    )
+    if not verbose:
+        return row
+        
+    # Wrap the prompt to the column width
+    prompt = str(metadata.get('original_prompt', 'N/A'))
+    if len(prompt) > 37:
+        prompt = "\n".join(textwrap.wrap(
+            prompt, width=37, break_long_words=False, break_on_hyphens=False
+        ))
+    settings_text = format_settings(gen_info.get('generation_settings', {}))
+    return row + (prompt, settings_text or "No settings available")
+
+@lru_cache(maxsize=128)
+def format_model_info(anthropic: str, stability: str) -> str:
+    """Format model display compactly"""
+    parts = []
+    if anthropic != 'Unknown':
+        model_parts = anthropic.split('-')
+        parts.append(f"[cyan]A:[/cyan] {model_parts[0]}")
+        if len(model_parts) > 1:
+            parts.append(f"   {'-'.join(model_parts[1:])}")
+    else:
+        parts.append(f"[cyan]A:[/cyan] Unknown")
+        
+    if stability != 'Unknown':
+        parts.append(f"[cyan]S:[/cyan] {stability}")
+    else:
+        parts.append(f"[cyan]S:[/cyan] Unknown")
+        
+    return "\n".join(parts)
+
+# Dimension and model strings repeat across a directory, so rows mostly hit the cache
+@lru_cache(maxsize=64)
 def format_dimensions(dimensions: str) -> str:
     """Format dimensions with color based on common sizes"""
     if not dimensions or dimensions == 'Unknown':
@@ -900,16 +1030,14 @@ def format_settings(settings: dict) -> str:
     """Format generation settings in a readable way"""
     return "\n".join(f"{k}: {v}" for k, v in settings.items())
 
-def get_image_status(file_name: str, dir_path: Path, metadata: dict) -> str:
+def get_image_status(image_stat: Optional[os.stat_result], metadata: dict) -> str:
     """Get image status with color coding"""
-    image_path = dir_path / f"{file_name}.png"
-    
-    if not image_path.exists():
+    if image_stat is None:
         return "[red]●[/red] Missing"
         
     try:
         # Check if image matches metadata
-        actual_size = image_path.stat().st_size
+        actual_size = image_stat.st_size
         expected_size = metadata.get('image_info', {}).get('file_size_bytes', 0)
         
         if actual_size != expected_size:
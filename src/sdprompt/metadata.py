@@ -1,23 +1,67 @@
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Literal, Optional, TypedDict, cast
+import hmac
+import os
 import yaml
-import hashlib
-from pydantic import BaseModel
-from sdprompt.utils.hash import compute_file_hash
+from sdprompt.utils.hash import compute_file_hash, compute_file_hash_and_size
+from sdprompt.utils import fastjson
 
-class ImageMetadata(BaseModel):
+# Prefer the libyaml-backed loader and dumper when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
+def read_metadata(yaml_path: Path) -> Dict[str, Any]:
+    """Read image metadata, preferring the JSON sidecar when it is up to date"""
+    json_path = yaml_path.with_suffix(".json")
+    try:
+        # The sidecar is written after the YAML, so an older one means the YAML was edited
+        if json_path.stat().st_mtime_ns >= yaml_path.stat().st_mtime_ns:
+            data = fastjson.loads(json_path.read_bytes())
+            # Match what the YAML loader produces for the timestamp
+            if isinstance(data.get("timestamp"), str):
+                data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+            return data
+    except (OSError, ValueError):
+        pass  # No usable sidecar; fall back to the YAML
+    # Parse from one buffer rather than letting libyaml pull the file in small reads
+    return yaml.load(yaml_path.read_bytes(), Loader=_SafeLoader)
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write a file in one call and publish it with a rename, so readers never see it half-written"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+class ImageMetadata(TypedDict):
+    """Shape of a saved metadata file"""
     timestamp: datetime
     original_prompt: str
     generated_prompt: str
+    image_filename: str
     model_info: Dict[str, Dict[str, str]]
     image_parameters: Dict[str, Any]
     image_verification: Dict[str, Any]
     status: Dict[str, Any]
 
+_PLATFORM_NAMES = {"stability": "Stability AI", "bfl": "Black Forest Labs"}
+
+# Shared by every saved file; the dumpers only read it, so it is never copied
+_ANTHROPIC_MODEL_INFO = {
+    "model": "claude-3-sonnet",
+    "version": "1.0"
+}
+
+def _detect_platform(engine: str) -> str:
+    """Infer the platform from an engine id when the caller didn't say"""
+    return "bfl" if "flux" in engine.lower() else "stability"
+
 class MetadataHandler:
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, platform: Optional[Literal["stability", "bfl"]] = None):
         self.output_dir = output_dir
+        self.platform = platform
         
     def save_metadata(
         self,
@@ -27,10 +71,18 @@ class MetadataHandler:
         original_prompt: str
     ) -> None:
         """Save metadata for generated image"""
+        # One clock read for every timestamp in the file
         verification_time = datetime.now()
+        verification_iso = verification_time.isoformat()
         
-        # Determine which platform was used based on generation_result
-        is_bfl = "flux" in generation_result.get("engine", "").lower()
+        # Generators hash while writing; only re-read the file if they didn't
+        checksum = generation_result.get("checksum_sha256")
+        if checksum:
+            size_bytes = image_path.stat().st_size
+        else:
+            checksum, size_bytes = compute_file_hash_and_size(image_path)
+        
+        platform = self.platform or _detect_platform(generation_result.get("engine", ""))
         
         # Create metadata structure with only needed fields
         metadata = {
@@ -45,19 +97,15 @@ class MetadataHandler:
                 "height": generation_result["generation_settings"].get("height", 1024)
             },
             "image_verification": {
-                "size_bytes": image_path.stat().st_size,
-                "checksum_sha256": compute_file_hash(image_path),
-                "verification_time": verification_time.isoformat()
+                "size_bytes": size_bytes,
+                "checksum_sha256": checksum,
+                "verification_time": verification_iso
             },
             "model_info": {
-                "anthropic": {
-                    "model": "claude-3-sonnet",
-                    "version": "1.0"
-                },
-                # Use appropriate model info based on platform
+                "anthropic": _ANTHROPIC_MODEL_INFO,
                 "generator": {
                     "model": generation_result["engine"],
-                    "platform": "Black Forest Labs" if is_bfl else "Stability AI",
+                    "platform": _PLATFORM_NAMES[platform],
                     "version": "1.0"
                 }
             },
@@ -69,18 +117,24 @@ class MetadataHandler:
         
         # Save metadata to YAML file
         metadata_path = image_path.with_suffix(".yaml")
-        with open(metadata_path, "w") as f:
-            yaml.safe_dump(metadata, f, sort_keys=False, allow_unicode=True)
+        _write_atomic(metadata_path, yaml.dump(
+            metadata, Dumper=_SafeDumper, sort_keys=False, allow_unicode=True, encoding="utf-8"
+        ))
+            
+        # JSON sidecar for fast reads by list and verify; the YAML stays the editable copy
+        metadata["timestamp"] = verification_iso
+        _write_atomic(metadata_path.with_suffix(".json"), fastjson.dumps(metadata))
     
     def load_metadata(self, path: Path) -> ImageMetadata:
         """Load metadata from file"""
-        with open(path) as f:
-            data = yaml.safe_load(f)
-            return ImageMetadata(**data)
+        # We wrote this file ourselves, so it is typed rather than re-validated
+        return cast(ImageMetadata, read_metadata(path))
     
     def verify_image(self, image_path: Path, metadata: ImageMetadata) -> bool:
         """Verify image checksum against metadata"""
-        with open(image_path, 'rb') as f:
-            image_data = f.read()
-            current_checksum = hashlib.sha256(image_data).hexdigest()
-            return current_checksum == metadata.image_verification["checksum_sha256"] 
\ No newline at end of file
+        current = bytes.fromhex(compute_file_hash(image_path))
+        try:
+            expected = bytes.fromhex(metadata["image_verification"]["checksum_sha256"])
+        except (TypeError, ValueError):
+            return False  # Missing or malformed checksum in the metadata
+        return hmac.compare_digest(current, expected) 
\ No newline at end of file
@@ -1,18 +1,101 @@
-from typing import Dict, Any, Optional, List
+from typing import TYPE_CHECKING, Dict, Any, Optional, List, TypedDict
+import asyncio
 import json
 import re
 from pathlib import Path
-import anthropic
-from anthropic import AsyncAnthropic
-from pydantic import BaseModel, ValidationError
-from sdprompt.utils.retry import with_retry, create_progress
+from sdprompt.utils import fastjson, prompt_cache
 import logging
+import weakref
+
+# anthropic takes over a second to import, so it is only loaded once a client is needed
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
+
+# Section headers in Claude's structured reply, alone on their line
+_SECTION_RE = re.compile(
+    r'^[^\S\n]*(ANALYSIS|PROMPT|TECHNICAL SPECIFICATIONS|NEGATIVE PROMPT)[^\S\n]*$',
+    re.MULTILINE | re.IGNORECASE
+)
+# Characters that matter when scanning for a JSON object: escape pairs, quotes and braces
+_JSON_TOKEN_RE = re.compile(r'\\.|[{}"]', re.DOTALL)
+_BULLET_RE = re.compile(r'^- (.*)$', re.MULTILINE)
+_SPEC_RE = re.compile(r'^([^:\n]*):(.*)$', re.MULTILINE)
+_LINE_RE = re.compile(r'^[^\S\n]*(\S.*?)[^\S\n]*$', re.MULTILINE)
+
+_SYSTEM_PROMPT = """Analyze image generation prompts and optimize them for Stability AI's API.
+
+Key parameters and limits:
+- prompt: required, 1-10000 characters, should be descriptive and specific
+- negative_prompt: optional, max 10000 characters (not supported with turbo models)
+- cfg_scale: 1.0-10.0 (default: 7.0)
+- aspect_ratio (required):
+  - 16:9 (landscape)
+  - 1:1 (square)
+  - 21:9 (wide)
+  - 2:3 (portrait)
+  - 3:2 (landscape)
+  - 4:5 (portrait)
+  - 5:4 (landscape)
+  - 9:16 (portrait)
+  - 9:21 (wide portrait)
+- output_format: png or jpeg
+- seed: optional, 0-4294967294
+- models:
+  - sd3.5-large (6.5 credits, best quality)
+  - sd3.5-large-turbo (4 credits, faster, no negative prompts)
+  - sd3.5-medium (3.5 credits, balanced)
+  - sd3-large (6.5 credits)
+  - sd3-large-turbo (4 credits, no negative prompts)
+  - sd3-medium (3.5 credits)
+
+Return a JSON object with:
+{
+    "generation": {
+        "prompt": "optimized prompt with style tags",
+        "negative_prompt": "things to avoid (omit for turbo models)",
+        "parameters": {
+            "cfg_scale": float (1.0-10.0),
+            "aspect_ratio": string (from aspect ratio list),
+            "output_format": string ("png" or "jpeg"),
+            "model": string (from model list),
+            "seed": int (optional, 0-4294967294)
+        }
+    },
+    "analysis": {
+        "style": "detected style",
+        "subject": "main subject",
+        "mood": "overall mood/tone"
+    }
+}
+
+Guidelines:
+- Keep prompts clear and focused
+- Include artistic style and quality terms
+- Consider composition and lighting
+- Avoid problematic content
+- Choose appropriate model based on needs:
+  - Use turbo models for speed (but no negative prompts)
+  - Use large models for best quality
+  - Use medium models for balance
+- Choose aspect ratio appropriate for the scene
+
+Keep prompts focused and coherent."""
+
+# System prompt marked cacheable, so repeat requests reuse the server-side prefill.
+# At roughly 500 tokens it is still below the 1,024-token minimum cacheable prefix,
+# so the API ignores the marker and cache_read_input_tokens stays 0 until it grows.
+_SYSTEM_BLOCKS = [{"type": "text", "text": _SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+# Longest user prompt accepted for analysis, in characters (documented in the README and CLI help)
+_MAX_PROMPT_CHARS = 999
+
+_USER_PROMPT_PREFIX = "Analyze this prompt and return a JSON object with the specified fields: "
 
 class PromptError(Exception):
     """Base class for prompt-related errors"""
     pass
 
-class PromptValidationError(PromptError):
+class PromptValidationError(PromptError, ValueError):
     """Error for invalid prompt content"""
     pass
 
@@ -34,145 +117,251 @@ class ResponseParsingError(PromptError):
         self.response = response
         super().__init__(f"{message}: Missing sections: {', '.join(missing_sections)}")
 
-class PromptAnalysis(BaseModel):
+class PromptAnalysis(TypedDict):
     subject: Dict[str, Any]
     style: Dict[str, Any]
     technical: Dict[str, Any]
     challenges: list[str]
 
-class GenerationSpec(BaseModel):
+class GenerationSpec(TypedDict):
     prompt: str
     negative_prompt: str
     parameters: Dict[str, Any]
 
+class _ClientPool:
+    """Anthropic clients, one per API key, sharing an HTTP/2 connection pool"""
+
+    def __init__(self):
+        from anthropic import DefaultAsyncHttpxClient
+        self.http_client = DefaultAsyncHttpxClient(http2=True)
+        self.clients: Dict[str, "AsyncAnthropic"] = {}
+        self.refs: Dict[str, int] = {}
+
+    def acquire(self, api_key: str) -> "AsyncAnthropic":
+        """Take a reference to the client for api_key, creating it on first use"""
+        client = self.clients.get(api_key)
+        if client is None:
+            from anthropic import AsyncAnthropic
+            client = self.clients[api_key] = AsyncAnthropic(api_key=api_key, http_client=self.http_client)
+        self.refs[api_key] = self.refs.get(api_key, 0) + 1
+        return client
+
+    def release(self, api_key: str) -> bool:
+        """Drop one reference to a client, returning True once no client is in use"""
+        self.refs[api_key] -= 1
+        if not self.refs[api_key]:
+            del self.refs[api_key], self.clients[api_key]
+        return not self.clients
+
+# Connections belong to the loop that opened them, so pools are only shared within one loop
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _ClientPool]" = weakref.WeakKeyDictionary()
+
+def _find_json_span(content: str) -> tuple[int, int]:
+    """Locate the first balanced JSON object in content, or return (-1, -1)"""
+    depth = 0
+    start = -1
+    in_str = False
+    # Only structural characters are visited, so plain text is skipped at C speed
+    for match in _JSON_TOKEN_RE.finditer(content):
+        token = match.group()
+        if depth == 0:
+            if token == "{":
+                start = match.start()
+                depth = 1
+        elif token == '"':
+            in_str = not in_str
+        elif in_str or len(token) == 2:
+            continue
+        elif token == "{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return start, match.end()
+    return -1, -1
+
+def _parse_analysis(name: str, body: str, sections: Dict[str, Any]) -> None:
+    """Collect the bullet items of a section"""
+    sections[name].extend(item.strip() for item in _BULLET_RE.findall(body))
+
+def _spec_dict(body: str) -> Dict[str, str]:
+    """Map the key: value lines of a section body, skipping lines without a colon"""
+    return {key.strip(): value.strip() for key, value in _SPEC_RE.findall(body)}
+
+def _parse_specs(name: str, body: str, sections: Dict[str, Any]) -> None:
+    """Collect the key: value lines of a section"""
+    sections[name].update(_spec_dict(body))
+
+def _parse_last_line(name: str, body: str, sections: Dict[str, Any]) -> None:
+    """Keep the last non-blank line of a section"""
+    lines = _LINE_RE.findall(body)
+    if lines:
+        sections[name] = lines[-1]
+
+# Body parser for each section of Claude's reply
+_SECTION_HANDLERS = {
+    "ANALYSIS": _parse_analysis,
+    "PROMPT": _parse_last_line,
+    "TECHNICAL SPECIFICATIONS": _parse_specs,
+    "NEGATIVE PROMPT": _parse_last_line,
+}
+_REQUIRED_SECTIONS = frozenset(_SECTION_HANDLERS)
+
+# Result field and specification line key for each technical detail
+_TECHNICAL_FIELDS = (
+    ("composition", "Composition"),
+    ("lighting", "Lighting"),
+    ("color", "Color Scheme"),
+)
+
+# Generation parameters passed through from Claude's analysis
+_SUPPORTED_PARAMS = frozenset({"cfg_scale", "seed", "output_format", "model", "aspect_ratio"})
+
+def _clamp_seed(value) -> int:
+    """Coerce a seed to a non-negative int, using 0 when it is invalid"""
+    try:
+        return max(0, int(value))
+    except (ValueError, TypeError):
+        return 0
+
+def _clamp(value, lo, hi):
+    """Limit a value to the closed range [lo, hi]"""
+    return lo if value < lo else hi if value > hi else value
+
 class PromptGenerator:
-    def __init__(self, api_key: str, model: str):
+    def __init__(self, api_key: str, model: str, use_cache: bool = False):
         self.api_key = api_key
         self.model = model
-        self.client = AsyncAnthropic(api_key=api_key)
+        self.use_cache = use_cache
+        # Generators created on the same running loop share a pool; others get their own
+        try:
+            self._loop = asyncio.get_running_loop()
+            self._pool = _pools.get(self._loop)
+            if self._pool is None:
+                self._pool = _pools[self._loop] = _ClientPool()
+        except RuntimeError:
+            self._loop, self._pool = None, _ClientPool()
+        self.client = self._pool.acquire(api_key)
+
+    async def aclose(self) -> None:
+        """Release the shared Anthropic client, closing the connection pool once nothing uses it"""
+        pool, self._pool = self._pool, None
+        if pool is None or not pool.release(self.api_key):
+            return
+        # Unregister first so later generators get a fresh pool rather than a closed one
+        if self._loop is not None and _pools.get(self._loop) is pool:
+            del _pools[self._loop]
+        await pool.http_client.aclose()
+
+    async def __aenter__(self) -> "PromptGenerator":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def analyze_prompts(self, prompts: List[str], concurrency: int = 8) -> List[dict]:
+        """Analyze several prompts concurrently, keeping at most concurrency requests in flight"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def analyze(prompt: str) -> dict:
+            async with semaphore:
+                return await self.analyze_prompt(prompt)
+
+        return await asyncio.gather(*(analyze(prompt) for prompt in prompts))
 
     async def analyze_prompt(self, prompt: str) -> dict:
         """Analyze user prompt and generate optimized prompt for image generation"""
+        if not prompt:
+            raise PromptValidationError("Prompt is empty")
+        if len(prompt) > _MAX_PROMPT_CHARS:
+            raise PromptValidationError(f"Prompt is longer than {_MAX_PROMPT_CHARS} characters")
+        
+        # When enabled, identical requests reuse the earlier analysis instead of calling Claude again
+        cache_key = prompt_cache.cache_key(self.model, _SYSTEM_PROMPT, prompt)
+        if self.use_cache:
+            cached = prompt_cache.load(cache_key)
+            if cached is not None:
+                # Same status shape as a fresh analysis; no request means no cached input tokens
+                cached.setdefault("status", {})["cache_read_input_tokens"] = 0
+                return cached
+        
         try:
-            # Create message with async client
-            response = await self.client.messages.create(
+            # Stream the reply so we can stop as soon as the JSON object is complete
+            content = ""
+            async with self.client.messages.stream(
                 model=self.model,
                 max_tokens=1024,
-                system=await self._get_system_prompt(),  # System prompt as top-level parameter
+                system=self._get_system_prompt(),  # System prompt as top-level parameter
                 messages=[{
                     "role": "user",
-                    "content": f"Analyze this prompt and return a JSON object with the specified fields: {prompt}"
+                    "content": _USER_PROMPT_PREFIX + prompt
                 }]
-            )
+            ) as stream:
+                async for text in stream.text_stream:
+                    content += text
+                    # Only a closing brace can complete the object, so skip the scan otherwise
+                    if "}" in text and _find_json_span(content)[0] >= 0:
+                        break
+                # Usage arrives with the first event, so it is known even when we stop early
+                cache_read_tokens = stream.current_message_snapshot.usage.cache_read_input_tokens or 0
             
             # Extract JSON from response
-            content = response.content[0].text
-            # Find JSON block
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if not json_match:
+            start, end = _find_json_span(content)
+            if start < 0:
                 # If no JSON found, try to parse the entire response
                 try:
-                    result = json.loads(content)
+                    result = fastjson.loads(content)
                 except json.JSONDecodeError:
                     logging.error(f"Failed to parse response: {content}")
                     raise ValueError("Invalid response format from Claude")
             else:
-                result = json.loads(json_match.group())
+                result = fastjson.loads(content[start:end])
             
             # Validate and adjust parameters
             params = result.get("generation", {}).get("parameters", {})
             
-            # Ensure valid seed (0 if not specified or invalid)
+            # Drop unsupported parameters first so only kept values are coerced
+            params = {k: v for k, v in params.items() if k in _SUPPORTED_PARAMS}
+            
             if "seed" in params:
-                try:
-                    seed_val = int(params["seed"])
-                    if seed_val < 0:
-                        params["seed"] = 0
-                except (ValueError, TypeError):
-                    params["seed"] = 0
+                params["seed"] = _clamp_seed(params["seed"])
             
-            # Clamp cfg_scale
+            # Clamp cfg_scale, skipping the coercion when the model already returned a number
             if "cfg_scale" in params:
-                params["cfg_scale"] = min(max(float(params["cfg_scale"]), 1.0), 10.0)
-            
-            # Remove unsupported parameters
-            supported_params = {"cfg_scale", "seed", "output_format", "model", "aspect_ratio"}
-            params = {k: v for k, v in params.items() if k in supported_params}
+                cfg_scale = params["cfg_scale"]
+                if type(cfg_scale) is not float:
+                    cfg_scale = float(cfg_scale)
+                params["cfg_scale"] = _clamp(cfg_scale, 1.0, 10.0)
             
             # Update result with adjusted parameters
             if "generation" in result:
                 result["generation"]["parameters"] = params
             
+            if self.use_cache:
+                # Leave the seed out so a cached analysis doesn't pin every rerun to one image
+                cached = result
+                if "seed" in params:
+                    cached = {**result, "generation": {
+                        **result["generation"],
+                        "parameters": {k: v for k, v in params.items() if k != "seed"},
+                    }}
+                prompt_cache.store(cache_key, cached)
+            
+            # Per-request stat, so it is attached after the result is cached
+            result.setdefault("status", {})["cache_read_input_tokens"] = cache_read_tokens
             return result
             
         except Exception as e:
             logging.error(f"Error analyzing prompt: {str(e)}")
-            logging.debug(f"Response content: {response.content if 'response' in locals() else 'No response'}")
-            raise RuntimeError(f"Failed to analyze prompt: {str(e)}")
+            logging.debug(f"Response content: {content if 'content' in locals() else 'No response'}")
+            raise PromptAnalysisError(f"Failed to analyze prompt: {str(e)}") from e
     
-    async def _get_system_prompt(self) -> str:
-        return """Analyze image generation prompts and optimize them for Stability AI's API.
-
-Key parameters and limits:
-- prompt: required, 1-10000 characters, should be descriptive and specific
-- negative_prompt: optional, max 10000 characters (not supported with turbo models)
-- cfg_scale: 1.0-10.0 (default: 7.0)
-- aspect_ratio (required):
-  - 16:9 (landscape)
-  - 1:1 (square)
-  - 21:9 (wide)
-  - 2:3 (portrait)
-  - 3:2 (landscape)
-  - 4:5 (portrait)
-  - 5:4 (landscape)
-  - 9:16 (portrait)
-  - 9:21 (wide portrait)
-- output_format: png or jpeg
-- seed: optional, 0-4294967294
-- models:
-  - sd3.5-large (6.5 credits, best quality)
-  - sd3.5-large-turbo (4 credits, faster, no negative prompts)
-  - sd3.5-medium (3.5 credits, balanced)
-  - sd3-large (6.5 credits)
-  - sd3-large-turbo (4 credits, no negative prompts)
-  - sd3-medium (3.5 credits)
-
-Return a JSON object with:
-{
-    "generation": {
-        "prompt": "optimized prompt with style tags",
-        "negative_prompt": "things to avoid (omit for turbo models)",
-        "parameters": {
-            "cfg_scale": float (1.0-10.0),
-            "aspect_ratio": string (from aspect ratio list),
-            "output_format": string ("png" or "jpeg"),
-            "model": string (from model list),
-            "seed": int (optional, 0-4294967294)
-        }
-    },
-    "analysis": {
-        "style": "detected style",
-        "subject": "main subject",
-        "mood": "overall mood/tone"
-    }
-}
-
-Guidelines:
-- Keep prompts clear and focused
-- Include artistic style and quality terms
-- Consider composition and lighting
-- Avoid problematic content
-- Choose appropriate model based on needs:
-  - Use turbo models for speed (but no negative prompts)
-  - Use large models for best quality
-  - Use medium models for balance
-- Choose aspect ratio appropriate for the scene
-
-Keep prompts focused and coherent."""
+    @staticmethod
+    def _get_system_prompt() -> List[Dict[str, Any]]:
+        return _SYSTEM_BLOCKS
     
     def _parse_response(self, response: str) -> Dict[str, Any]:
         """Parse Claude's response into structured format"""
-        required_sections = {"ANALYSIS", "PROMPT", "TECHNICAL SPECIFICATIONS", "NEGATIVE PROMPT"}
         sections = {
             "ANALYSIS": [],
             "PROMPT": "",
@@ -180,32 +369,17 @@ Keep prompts focused and coherent."""
             "NEGATIVE PROMPT": "",
         }
         
-        # Parse sections
-        current_section = None
+        # Split into [preamble, name, body, name, body, ...] in one pass
         found_sections = set()
+        parts = _SECTION_RE.split(response)
         
-        for line in response.split("\n"):
-            section = line.strip().upper()
-            if section in required_sections:
-                current_section = section
-                found_sections.add(section)
-                continue
-                
-            if current_section and line.strip():
-                if current_section == "ANALYSIS":
-                    if line.startswith("- "):
-                        sections[current_section].append(line[2:].strip())
-                elif current_section == "PROMPT":
-                    sections[current_section] = line.strip()
-                elif current_section == "TECHNICAL SPECIFICATIONS":
-                    if ":" in line:
-                        key, value = line.split(":", 1)
-                        sections[current_section][key.strip()] = value.strip()
-                elif current_section == "NEGATIVE PROMPT":
-                    sections[current_section] = line.strip()
+        for name, body in zip(parts[1::2], parts[2::2]):
+            current_section = name.upper()
+            found_sections.add(current_section)
+            _SECTION_HANDLERS[current_section](current_section, body, sections)
         
         # Validate all required sections are present
-        missing_sections = required_sections - found_sections
+        missing_sections = _REQUIRED_SECTIONS - found_sections
         if missing_sections:
             raise ResponseParsingError(
                 "Incomplete response from Claude",
@@ -213,6 +387,8 @@ Keep prompts focused and coherent."""
                 response
             )
         
+        primary, elements, challenges = self._partition_analysis(sections["ANALYSIS"])
+        
         # Convert to tool spec format
         result = {
             "status": {
@@ -221,10 +397,13 @@ Keep prompts focused and coherent."""
                 "warnings": []
             },
             "analysis": {
-                "subject": self._extract_subject(sections["ANALYSIS"]),
+                "subject": {
+                    "primary": primary,
+                    "elements": elements
+                },
                 "style": self._extract_style(sections["TECHNICAL SPECIFICATIONS"]),
                 "technical": self._extract_technical(sections["TECHNICAL SPECIFICATIONS"]),
-                "challenges": self._extract_challenges(sections["ANALYSIS"])
+                "challenges": challenges
             },
             "generation": {
                 "prompt": sections["PROMPT"],
@@ -235,35 +414,37 @@ Keep prompts focused and coherent."""
         
         return result
     
-    def _extract_subject(self, analysis: list[str]) -> Dict[str, Any]:
-        """Extract subject information from analysis"""
-        primary = next((item for item in analysis if "subject" in item.lower()), "")
-        elements = [item for item in analysis if "element" in item.lower()]
-        return {
-            "primary": primary,
-            "elements": elements
-        }
+    def _partition_analysis(self, analysis: list[str]) -> tuple[str, list[str], list[str]]:
+        """Split analysis items into primary subject, elements and challenges in one pass"""
+        primary = ""
+        elements = []
+        challenges = []
+        for item in analysis:
+            lowered = item.lower()
+            if not primary and "subject" in lowered:
+                primary = item
+            if "element" in lowered:
+                elements.append(item)
+            if "challenge" in lowered:
+                challenges.append(item)
+        return primary, elements, challenges
     
     def _extract_style(self, tech_specs: Dict[str, str]) -> Dict[str, Any]:
         """Extract style information from technical specifications"""
         style = tech_specs.get("Style/Medium", "")
-        influences = [s.strip() for s in style.split(",") if s.strip()]
+        influences = [s for s in map(str.strip, style.split(",")) if s]
         return {
             "primary": influences[0] if influences else "",
             "influences": influences[1:] if len(influences) > 1 else []
         }
     
+    def _extract_technical_from_text(self, section: str) -> Dict[str, Any]:
+        """Extract technical information straight from a raw specifications section"""
+        return self._extract_technical(_spec_dict(section))
+    
     def _extract_technical(self, tech_specs: Dict[str, str]) -> Dict[str, Any]:
         """Extract technical information from specifications"""
-        return {
-            "composition": tech_specs.get("Composition", ""),
-            "lighting": tech_specs.get("Lighting", ""),
-            "color": tech_specs.get("Color Scheme", "")
-        }
-    
-    def _extract_challenges(self, analysis: list[str]) -> list[str]:
-        """Extract challenges from analysis"""
-        return [item for item in analysis if "challenge" in item.lower()]
+        return {field: tech_specs.get(key, "") for field, key in _TECHNICAL_FIELDS}
     
     def _extract_parameters(self, tech_specs: Dict[str, str]) -> Dict[str, Any]:
         """Extract generation parameters from specifications"""
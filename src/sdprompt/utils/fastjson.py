@@ -0,0 +1,20 @@
+from typing import Any
+import json
+
+# Prefer the orjson C extension when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(obj: Any) -> bytes:
+    """Serialize an object to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def loads(data: bytes) -> Any:
+    """Parse JSON from bytes or str, raising json.JSONDecodeError on bad input"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,69 @@
+from pathlib import Path
+import hashlib
+import os
+import tempfile
+import httpx
+
+# Read size used when streaming image bodies to disk
+CHUNK_SIZE = 64 * 1024
+
+async def write_stream(response: httpx.Response, output_path: Path) -> str:
+    """Stream a response body to disk and return its SHA256 checksum
+
+    The body goes to a temporary file that replaces output_path only once it is
+    complete, so a failed or cancelled download never leaves a partial image.
+    The parent directory of output_path must already exist.
+    """
+    length = int(response.headers.get("content-length") or 0)
+    file_hash = hashlib.sha256()
+    written = 0
+
+    fd, tmp = tempfile.mkstemp(dir=output_path.parent, prefix=f".{output_path.name}.", suffix=".tmp")
+    try:
+        try:
+            # Reserve the whole extent up front when the size is known
+            preallocated = False
+            if length and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, length)
+                    preallocated = True
+                except OSError:
+                    pass  # Not every filesystem supports it
+
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                file_hash.update(chunk)
+                view = memoryview(chunk)
+                while view:
+                    n = os.write(fd, view)
+                    view = view[n:]
+                    written += n
+
+            # Content-Length is the encoded size, so trim any unused reservation
+            if preallocated and written != length:
+                os.ftruncate(fd, written)
+        finally:
+            os.close(fd)
+        # mkstemp creates the file owner-only; images are normally world-readable
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, output_path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+    return file_hash.hexdigest()
+
+def prune_dir(directory: Path, max_entries: int) -> None:
+    """Delete the oldest files in a cache directory until at most max_entries remain"""
+    try:
+        with os.scandir(directory) as it:
+            entries = [(e.stat().st_mtime_ns, e.path) for e in it if e.is_file()]
+    except OSError:
+        return  # Nothing cached yet
+    if len(entries) <= max_entries:
+        return
+    entries.sort()
+    for _, path in entries[:len(entries) - max_entries]:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass  # Already removed by a concurrent run
@@ -1,11 +1,82 @@
 from pathlib import Path
+from typing import Tuple
+from functools import lru_cache
 import hashlib
+import mmap
+import os
+import tempfile
+from sdprompt.utils.files import prune_dir
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "sdprompt" / "hash"
+
+# Upper bound on persisted digests; the oldest are dropped first
+_CACHE_MAX_ENTRIES = 10_000
+
+_pruned = False
+
+def _digest_open_file(f) -> str:
+    """SHA256 of an open file, read through a memory map where possible"""
+    try:
+        # Mapping skips the copy into a read buffer; empty and special files cannot be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+    except (ValueError, OSError):
+        f.seek(0)
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 def compute_file_hash(file_path: Path) -> str:
     """Compute SHA256 hash of a file"""
-    sha256_hash = hashlib.sha256()
     with open(file_path, "rb") as f:
-        # Read the file in chunks to handle large files
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest() 
\ No newline at end of file
+        return _digest_open_file(f)
+
+def compute_file_hash_and_size(file_path: Path) -> Tuple[str, int]:
+    """Compute SHA256 hash and byte size of a file in one pass"""
+    with open(file_path, "rb") as f:
+        digest = _digest_open_file(f)
+        return digest, os.fstat(f.fileno()).st_size
+
+@lru_cache(maxsize=4096)
+def _hash_for(key: Tuple[str, int, int, int, int]) -> str:
+    """Hash the file described by key, consulting the on-disk cache first"""
+    cache_path = CACHE_DIR / hashlib.sha256(repr(key).encode()).hexdigest()
+    try:
+        digest = cache_path.read_text()
+        if len(digest) == 64:
+            return digest
+    except OSError:
+        pass  # Not cached yet
+
+    digest = compute_file_hash(Path(key[0]))
+
+    # Trim the on-disk cache once per process, before it gains new entries
+    global _pruned
+    if not _pruned:
+        _pruned = True
+        prune_dir(CACHE_DIR, _CACHE_MAX_ENTRIES)
+
+    # Write atomically so concurrent verifiers never see a partial entry
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(digest)
+            os.replace(tmp, cache_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass  # The cache is best effort
+
+    return digest
+
+def cached_file_hash(file_path: Path) -> str:
+    """Compute SHA256 hash of a file, reusing earlier results while it is unchanged
+
+    The cache is keyed on stat metadata, so it cannot detect corruption that leaves
+    the metadata alone (e.g. bit rot); use compute_file_hash to check file integrity.
+    """
+    st = os.stat(file_path)
+    # Any write to the file moves ctime, and ctime cannot be set back like mtime can
+    key = (str(Path(file_path).resolve()), st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+    return _hash_for(key)
@@ -1,54 +1,130 @@
 from pathlib import Path
 from PIL import Image
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional, Union
+import struct
 import time
 from datetime import datetime
 
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG start-of-frame markers, which carry the image size (C4, C8 and CC are not frames)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _read_jpeg_size(f) -> Optional[Tuple[int, int]]:
+    """Walk JPEG segment headers up to the first frame header"""
+    f.seek(2)
+    while True:
+        if f.read(1) != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":  # Fill bytes before the marker code
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD8:
+            continue  # Standalone markers have no length field
+        segment = f.read(2)
+        if len(segment) < 2:
+            return None
+        if code in _JPEG_SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        f.seek(struct.unpack(">H", segment)[0] - 2, 1)
+
+def _read_webp_size(head: bytes) -> Optional[Tuple[int, int]]:
+    """Read the canvas size from the first chunk of a WebP file"""
+    chunk = head[12:16]
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and head[20] == 0x2F:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+def read_image_header(image_path: Path) -> Optional[Tuple[int, int, str]]:
+    """Read (width, height, format) of a PNG, JPEG or WebP from its header bytes, or None"""
+    with open(image_path, "rb") as f:
+        head = f.read(30)
+        if head[:8] == PNG_SIGNATURE and head[12:16] == b"IHDR":
+            width, height = struct.unpack(">II", head[16:24])
+            return width, height, "png"
+        if head[:3] == b"\xff\xd8\xff":
+            size = _read_jpeg_size(f)
+            return (*size, "jpeg") if size else None
+    if len(head) == 30 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        size = _read_webp_size(head)
+        return (*size, "webp") if size else None
+    return None
+
+class VerificationError(Exception):
+    """Raised when an image does not match its metadata"""
+    pass
+
 class ImageVerifier:
     """Utility class for image verification"""
     
     @staticmethod
     def verify_dimensions(image_path: Path, expected_width: int, expected_height: int) -> bool:
         """Verify image dimensions"""
-        with Image.open(image_path) as img:
-            width, height = img.size
-            return width == expected_width and height == expected_height
+        width, height, _ = ImageVerifier.read_header(image_path)
+        return width == expected_width and height == expected_height
             
     @staticmethod
     def verify_format(image_path: Path, expected_format: str) -> bool:
         """Verify image format"""
-        with Image.open(image_path) as img:
-            return img.format.lower() == expected_format.lower()
+        return ImageVerifier.read_header(image_path)[2] == expected_format.lower()
             
     @staticmethod
-    def verify_timestamp(timestamp: str, max_age_seconds: int = None) -> bool:
+    def read_header(image_path: Path) -> Tuple[int, int, str]:
+        """Read (width, height, format) with a single open of the image"""
+        # The formats we generate are parsed directly, so PIL is only needed for anything else
+        header = read_image_header(image_path)
+        if header is not None:
+            return header
+        with Image.open(image_path) as img:
+            return img.width, img.height, img.format.lower()
+
+    @staticmethod
+    def check_dimensions(actual: Tuple[int, int], expected_width: int, expected_height: int) -> bool:
+        """Check already-read dimensions"""
+        return actual == (expected_width, expected_height)
+
+    @staticmethod
+    def check_format(actual_format: str, expected_format: str) -> bool:
+        """Check an already-read format"""
+        return actual_format.lower() == expected_format.lower()
+
+    @staticmethod
+    def verify_timestamp(timestamp: Union[str, datetime], max_age_seconds: int = None) -> bool:
         """Verify image timestamp is valid and not in the future"""
         try:
-            img_time = datetime.fromisoformat(timestamp)
-            now = datetime.now()
-            
-            # Check if timestamp is in the future
-            if img_time > now:
-                return False
-                
-            # Check age if specified
-            if max_age_seconds is not None:
-                age = (now - img_time).total_seconds()
-                if age > max_age_seconds:
-                    return False
-                    
-            return True
-        except ValueError:
+            # YAML loads unquoted ISO timestamps as datetime already
+            if not isinstance(timestamp, datetime):
+                timestamp = datetime.fromisoformat(timestamp)
+            img_ts = timestamp.timestamp()
+        except (TypeError, ValueError):
             return False
+
+        # Compare epoch seconds, which also works across naive and aware values
+        now = time.time()
+        return img_ts <= now and (max_age_seconds is None or now - img_ts <= max_age_seconds)
             
     @staticmethod
     def get_image_info(image_path: Path) -> Dict[str, Any]:
         """Get basic image information"""
+        st = image_path.stat()
         with Image.open(image_path) as img:
             return {
                 "format": img.format.lower(),
                 "dimensions": f"{img.width}x{img.height}",
                 "mode": img.mode,
-                "size_bytes": image_path.stat().st_size,
-                "last_modified": datetime.fromtimestamp(image_path.stat().st_mtime).isoformat()
+                "size_bytes": st.st_size,
+                "last_modified": datetime.fromtimestamp(st.st_mtime).isoformat()
             } 
\ No newline at end of file
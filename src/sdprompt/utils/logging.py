@@ -3,6 +3,9 @@ from pathlib import Path
 from rich.logging import RichHandler
 from typing import Optional
 
+# Formatters hold no per-handler state, so one instance serves every file handler
+_FILE_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
 def setup_logging(
     level: str = "INFO",
     log_file: Optional[Path] = None,
@@ -20,9 +23,7 @@ def setup_logging(
     # Add file handler if specified
     if log_file:
         file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(
-            logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        )
+        file_handler.setFormatter(_FILE_FORMATTER)
         logging.getLogger().addHandler(file_handler)
     
     # Create logger
@@ -0,0 +1,58 @@
+from pathlib import Path
+from typing import Any, Optional
+import hashlib
+import os
+import tempfile
+import time
+from sdprompt.utils import fastjson
+from sdprompt.utils.files import prune_dir
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "sdprompt" / "prompts"
+
+# Entries older than this are treated as missing and re-analyzed
+MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+
+# Upper bound on stored analyses; the oldest are dropped first
+_MAX_ENTRIES = 1000
+
+_pruned = False
+
+def cache_key(*parts: str) -> str:
+    """Stable key for a prompt analysis request"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def load(key: str) -> Optional[Any]:
+    """Return a cached analysis result, or None when there is none or it has expired"""
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        if time.time() - path.stat().st_mtime > MAX_AGE_SECONDS:
+            return None
+        return fastjson.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None  # Missing or unreadable entry
+
+def store(key: str, result: Any) -> None:
+    """Save an analysis result for later runs with the same request"""
+    # Trim the cache once per process, before it gains new entries
+    global _pruned
+    if not _pruned:
+        _pruned = True
+        prune_dir(CACHE_DIR, _MAX_ENTRIES)
+
+    # Write atomically so concurrent runs never see a partial entry
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(fastjson.dumps(result))
+            os.replace(tmp, CACHE_DIR / f"{key}.json")
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass  # The cache is best effort
@@ -0,0 +1,32 @@
+from typing import Mapping, Optional
+import asyncio
+import time
+
+class RateLimiter:
+    """Holds new requests back while the server has asked clients to wait"""
+
+    def __init__(self, max_delay: float):
+        """Honour Retry-After values of at most max_delay seconds"""
+        self.max_delay = max_delay
+        self._blocked_until = 0.0
+
+    async def acquire(self) -> None:
+        """Wait out any pause requested by an earlier response"""
+        wait = self._blocked_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Pause new requests for the response's Retry-After, returning the delay if it is honoured"""
+        retry_after = headers.get("retry-after")
+        if retry_after is None:
+            return None
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            return None  # HTTP-date values are left to the caller's error handling
+        if delay > self.max_delay:
+            return None  # Longer waits are reported as errors rather than stalling every request
+
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+        return delay
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+
+RESPONSES_PATH = Path(__file__).parent / "responses.json"
+RECORD = os.environ.get("MKIMG_RECORD") == "1"
+
+async def _replay(text: str):
+    yield text
+
+class CachedAnthropic:
+    """Replays recorded Claude replies keyed by request, recording new ones when MKIMG_RECORD=1"""
+
+    def __init__(self, responses: dict):
+        self.responses = responses
+
+    @staticmethod
+    def key(model: str, system: list, messages: list) -> str:
+        system_text = "\0".join(block["text"] for block in system)
+        user = "\0".join(message["content"] for message in messages)
+        return hashlib.sha256(f"{model}\0{system_text}\0{user}".encode()).hexdigest()
+
+    @asynccontextmanager
+    async def stream(self, *, model: str, system: list, messages: list, **kwargs):
+        key = self.key(model, system, messages)
+        if key not in self.responses:
+            # A miss means the request changed, so replay mode must not pass silently
+            if not RECORD:
+                pytest.fail(f"No recorded Claude response for key {key}; rerun with MKIMG_RECORD=1")
+            api_key = os.environ.get("ANTHROPIC_API_KEY")
+            if not api_key:
+                pytest.skip("MKIMG_RECORD=1 needs ANTHROPIC_API_KEY to record new responses")
+            from anthropic import AsyncAnthropic
+            async with AsyncAnthropic(api_key=api_key) as client:
+                async with client.messages.stream(model=model, system=system, messages=messages, **kwargs) as stream:
+                    self.responses[key] = await stream.get_final_text()
+        yield SimpleNamespace(
+            text_stream=_replay(self.responses[key]),
+            current_message_snapshot=SimpleNamespace(usage=SimpleNamespace(cache_read_input_tokens=0)),
+        )
+
+@pytest.fixture(scope="session")
+def anthropic_responses():
+    responses = json.loads(RESPONSES_PATH.read_text()) if RESPONSES_PATH.exists() else {}
+    yield responses
+    if RECORD:
+        RESPONSES_PATH.write_text(json.dumps(responses, indent=2, sort_keys=True) + "\n")
+
+@pytest.fixture(scope="session")
+def cached_anthropic(anthropic_responses):
+    """Route a generator's Claude calls through the recorded responses"""
+    def install(generator):
+        # Give this generator its own fake client rather than patching the shared one
+        replay = CachedAnthropic(anthropic_responses)
+        generator.client = SimpleNamespace(messages=SimpleNamespace(stream=replay.stream))
+        return generator
+    return install
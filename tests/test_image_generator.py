@@ -1,3 +1,4 @@
+import httpx
 import pytest
 from pathlib import Path
 from src.image_generator import ImageGenerator, ImageParameters
@@ -74,4 +75,29 @@ async def test_retry_mechanism(image_generator, tmp_path):
             negative_prompt="",
             parameters=params,
             output_path=output_path
-        ) 
\ No newline at end of file
+        ) 
+@pytest.mark.asyncio
+async def test_rate_limited_request_is_retried(tmp_path):
+    generator = ImageGenerator(api_key="sk-test", model="sd3.5-large")
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"retry-after": "0.01"}, json={"message": "Too many requests"})
+        return httpx.Response(200, headers={"seed": "7"}, content=b"image bytes")
+
+    generator.client = httpx.AsyncClient(base_url="https://api.stability.ai", transport=httpx.MockTransport(handler))
+    output_path = tmp_path / "test.png"
+
+    async with generator:
+        result = await generator.generate_image(
+            prompt="Test",
+            negative_prompt="",
+            parameters=ImageParameters(),
+            output_path=output_path
+        )
+
+    assert len(calls) == 2
+    assert result["generation_settings"]["seed"] == 7
+    assert output_path.read_bytes() == b"image bytes"
@@ -1,33 +1,46 @@
 import pytest
 from pathlib import Path
-from src.prompt_generator import PromptGenerator
+from src.prompt_generator import PromptGenerator, PromptValidationError, PromptAnalysisError
 import json
 
+@pytest.fixture(scope="session")
+def prompt_generator(cached_anthropic):
+    return cached_anthropic(PromptGenerator(api_key="sk-test", model="claude-3-sonnet", use_cache=False))
+
+@pytest.fixture
+def broken_prompt_generator():
+    generator = PromptGenerator(api_key="sk-test", model="claude-3-sonnet", use_cache=False)
+    generator.client = None  # Force API error
+    return generator
+
 @pytest.fixture
-def prompt_generator():
-    return PromptGenerator(api_key="sk-test", model="claude-3-sonnet")
+def prompt_batch():
+    subjects = ["mountain landscape", "city street", "forest clearing", "ocean cliff", "desert canyon"]
+    times = ["at sunset", "at dawn", "under a full moon", "in heavy fog"]
+    return [f"A serene {subject} {time}" for subject in subjects for time in times]
 
 @pytest.mark.asyncio
-async def test_prompt_analysis(prompt_generator):
-    result = await prompt_generator.analyze_prompt(
-        "A serene mountain landscape at sunset"
-    )
-    
-    assert "status" in result
-    assert "analysis" in result
-    assert "generation" in result
+async def test_prompt_analysis(prompt_generator, prompt_batch):
+    results = await prompt_generator.analyze_prompts(prompt_batch)
     
-    assert result["status"]["success"]
-    assert isinstance(result["generation"]["prompt"], str)
-    assert isinstance(result["generation"]["negative_prompt"], str)
+    assert len(results) == len(prompt_batch)
+    for result in results:
+        assert "status" in result
+        assert "analysis" in result
+        assert "generation" in result
+        
+        assert result["status"]["success"]
+        assert isinstance(result["generation"]["prompt"], str)
+        assert isinstance(result["generation"]["negative_prompt"], str)
 
+@pytest.mark.parametrize("bad,exc", [
+    ("", PromptValidationError),
+    ("a" * 1000, PromptValidationError),  # Too long
+])
 @pytest.mark.asyncio
-async def test_prompt_validation(prompt_generator):
-    with pytest.raises(ValueError):
-        await prompt_generator.analyze_prompt("")
-        
-    with pytest.raises(ValueError):
-        await prompt_generator.analyze_prompt("a" * 1000)  # Too long
+async def test_prompt_validation(prompt_generator, bad, exc):
+    with pytest.raises(exc):
+        await prompt_generator.analyze_prompt(bad)
 
 def test_response_parsing(prompt_generator):
     sample_response = """
@@ -54,19 +67,10 @@ blurry, oversaturated, poor composition...
     assert "mountain landscape" in result["analysis"]["subject"]["primary"] 
 
 @pytest.mark.asyncio
-async def test_prompt_error_handling(prompt_generator):
-    # Test empty prompt
-    with pytest.raises(PromptValidationError):
-        await prompt_generator.analyze_prompt("")
-    
-    # Test oversized prompt
-    with pytest.raises(PromptValidationError):
-        await prompt_generator.analyze_prompt("x" * 1000)
-    
+async def test_prompt_error_handling(broken_prompt_generator):
     # Test API error handling
-    prompt_generator.client = None  # Force API error
     with pytest.raises(PromptAnalysisError):
-        await prompt_generator.analyze_prompt("Test prompt")
+        await broken_prompt_generator.analyze_prompt("Test prompt")
 
 def test_response_section_parsing(prompt_generator):
     # Test missing sections
@@ -95,11 +99,7 @@ Camera: Wide angle
 Effects: Depth of field
 """
     
-    result = prompt_generator._extract_technical(
-        {k.strip(): v.strip() 
-         for k, v in [line.split(":", 1) 
-         for line in response.strip().split("\n")[1:]]}
-    )
+    result = prompt_generator._extract_technical_from_text(response)
     
     assert "composition" in result
     assert "lighting" in result